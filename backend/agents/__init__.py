@@ -1,11 +1,15 @@
 """Agents package - Survey Sensei AI Agents"""
 
+from .llm import shared_chat_llm, structured_output, partial_structured_output
 from .product_context_agent import product_context_agent, ProductContextAgent
 from .customer_context_agent import customer_context_agent, CustomerContextAgent
 from .survey_agent import survey_agent, SurveyAgent
 from .review_gen_agent import review_gen_agent, ReviewGenAgent
 
 __all__ = [
+    "shared_chat_llm",
+    "structured_output",
+    "partial_structured_output",
     "product_context_agent",
     "ProductContextAgent",
     "customer_context_agent",
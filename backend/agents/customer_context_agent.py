@@ -3,14 +3,14 @@ Agent 2: Autonomous customer context generation from user behavior and demograph
 Upgraded to work without form_data dependency with smart ranking algorithms.
 """
 
-from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field, validator
 from typing import List, Dict, Any
 from config import settings
 from database import db
-from utils import embedding_service
+from utils import embedding_service, json_loads
+from .llm import shared_chat_llm
 from datetime import datetime, timezone
 import json
 import math
@@ -130,12 +130,10 @@ class CustomerContext(BaseModel):
 
 class CustomerContextAgent:
     def __init__(self):
-        self.llm = ChatOpenAI(
-            model=settings.openai_model,
-            temperature=settings.openai_temperature,
-            api_key=settings.openai_api_key,
-        )
+        self.llm = shared_chat_llm
         self.parser = PydanticOutputParser(pydantic_object=CustomerContext)
+        # Format instructions depend only on the schema - build them once per agent
+        self.format_instructions = self.parser.get_format_instructions()
 
     def _parse_llm_response(self, response, fallback_context: CustomerContext) -> CustomerContext:
         """Parse LLM response with fallback"""
@@ -235,7 +233,7 @@ class CustomerContextAgent:
             product_text = f"{product.get('title', '')} {product.get('description', '')}"
             product_embedding = embedding_service.generate_embedding(product_text)
         elif isinstance(product_embedding, str):
-            product_embedding = json.loads(product_embedding)
+            product_embedding = json_loads(product_embedding)
 
         # Find similar product purchases (similarity threshold: 0.7)
         similar_transactions = db.find_user_similar_product_purchases(
@@ -415,7 +413,7 @@ Date: {review.get('timestamp', 'N/A')}"""
             "transaction_date": transaction.get("order_date", transaction.get("delivery_date", "Unknown")),
             "transaction_status": transaction.get("transaction_status", "unknown"),
             "review_section": review_section,
-            "format_instructions": self.parser.get_format_instructions(),
+            "format_instructions": self.format_instructions,
         }
 
         # Minimal logging - only key info
@@ -570,7 +568,7 @@ Based on this user's purchases and reviews of SIMILAR products, infer their like
             "similar_count": len(similar_interactions),
             "similar_transactions": "\n\n".join(txn_texts),
             "review_section": review_section,
-            "format_instructions": self.parser.get_format_instructions(),
+            "format_instructions": self.format_instructions,
         })
 
         fallback = CustomerContext(
@@ -645,7 +643,7 @@ Be realistic and acknowledge the limited data available.
             "total_purchases": user.get("total_purchases", 0),
             "total_reviews": user.get("total_reviews", 0),
             "engagement_level": user.get("engagement_level", "new_user"),
-            "format_instructions": self.parser.get_format_instructions(),
+            "format_instructions": self.format_instructions,
         })
 
         fallback = CustomerContext(
@@ -0,0 +1,92 @@
+"""
+Shared OpenAI chat client and structured-output helper for all agents.
+
+One ChatOpenAI instance means one sync and one async HTTP connection pool
+across the survey, context and review agents, instead of a pool per agent.
+"""
+
+import httpx
+import openai
+from functools import lru_cache
+from typing import Any, Dict
+from langchain.output_parsers.openai_functions import JsonOutputFunctionsParser
+from langchain_core.runnables import Runnable
+from langchain_core.utils.json_schema import dereference_refs
+from langchain_openai import ChatOpenAI
+from config import settings
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 multiplexing in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+# Connection pool sizing shared by the sync and async clients. Follow-up batches,
+# prefetches and review calls now overlap on the async client, so keep enough
+# idle connections warm that bursts don't pay fresh TLS handshakes
+_POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+
+_openai_client = openai.OpenAI(
+    api_key=settings.openai_api_key,
+    http_client=httpx.Client(http2=HTTP2_AVAILABLE, limits=_POOL_LIMITS),
+)
+_async_openai_client = openai.AsyncOpenAI(
+    api_key=settings.openai_api_key,
+    http_client=httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=_POOL_LIMITS),
+)
+
+shared_chat_llm = ChatOpenAI(
+    model=settings.openai_model,
+    temperature=settings.openai_temperature,
+    api_key=settings.openai_api_key,
+    client=_openai_client.chat.completions,
+    async_client=_async_openai_client.chat.completions,
+)
+
+
+@lru_cache(maxsize=None)
+def _openai_function(schema: type) -> Dict[str, Any]:
+    """OpenAI function spec for a Pydantic schema (refs inlined, built once per schema)"""
+    parameters = dereference_refs(schema.model_json_schema())
+    parameters.pop("$defs", None)
+    return {
+        "name": schema.__name__,
+        "description": schema.__doc__,
+        "parameters": parameters,
+    }
+
+
+def _function_call(llm: Runnable, schema: type, **llm_kwargs: Any) -> Runnable:
+    """Force an OpenAI function call for schema and parse its raw arguments"""
+    function = _openai_function(schema)
+    return (
+        llm.bind(functions=[function], function_call={"name": function["name"]}, **llm_kwargs)
+        | JsonOutputFunctionsParser(args_only=True)
+    )
+
+
+def structured_output(llm: Runnable, schema: type, **llm_kwargs: Any) -> Runnable:
+    """
+    Bind an OpenAI function call for a Pydantic schema and parse its arguments
+
+    The model answers through native function calling, so prompts carry no
+    format instructions and the output is validated straight into the schema.
+    Extra llm_kwargs are bound alongside (e.g. per-session request options).
+
+    Stands in for ChatOpenAI.with_structured_output, which the pinned
+    langchain-openai predates; langchain's own function converters only
+    understand pydantic v1 models.
+    """
+    return _function_call(llm, schema, **llm_kwargs) | schema.model_validate
+
+
+def partial_structured_output(llm: Runnable, schema: type, **llm_kwargs: Any) -> Runnable:
+    """
+    Streaming counterpart of structured_output
+
+    .stream() yields the function arguments parsed so far as plain dicts, so
+    callers can act on leading items before the whole object has arrived.
+    Partial objects are unvalidated - the trailing item may be truncated.
+    """
+    return _function_call(llm, schema, **llm_kwargs)
@@ -4,15 +4,17 @@ Generates product insights from reviews, similar products, or description.
 Operates autonomously without form_data dependency.
 """
 
-from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field, validator
 from typing import List, Dict, Any, Optional
 from config import settings
 from database import db
-from utils import embedding_service
+from utils import embedding_service, json_loads
+from .llm import shared_chat_llm
+from datetime import datetime, timezone
 import json
+import math
 
 
 class ProductContext(BaseModel):
@@ -52,12 +54,10 @@ class ProductContextAgent:
     """
 
     def __init__(self):
-        self.llm = ChatOpenAI(
-            model=settings.openai_model,
-            temperature=settings.openai_temperature,
-            api_key=settings.openai_api_key,
-        )
+        self.llm = shared_chat_llm
         self.parser = PydanticOutputParser(pydantic_object=ProductContext)
+        # Format instructions depend only on the schema - build them once per agent
+        self.format_instructions = self.parser.get_format_instructions()
 
     def generate_context(self, item_id: str) -> ProductContext:
         """
@@ -111,7 +111,8 @@ class ProductContextAgent:
         similar_products = db.find_similar_products(
             product_embedding=product_embedding,
             limit=settings.max_similar_products,
-            threshold=settings.similarity_threshold
+            threshold=settings.similarity_threshold,
+            review_limit=10
         )
 
         # Filter to only products with reviews
@@ -120,10 +121,15 @@ class ProductContextAgent:
             if p.get("review_count", 0) > 0 and p.get("item_id") != product.get("item_id")
         ]
 
-        # Fetch actual reviews for these products
-        for similar_product in products_with_reviews:
-            reviews = db.get_product_reviews(similar_product["item_id"], limit=10)
-            similar_product["reviews"] = reviews
+        # Reviews come embedded in the search results; fetch any missing ones
+        # in one request for all of them
+        missing = [p for p in products_with_reviews if "reviews" not in p]
+        if missing:
+            reviews_by_product = db.get_reviews_for_products(
+                [p["item_id"] for p in missing], limit=10
+            )
+            for similar_product in missing:
+                similar_product["reviews"] = reviews_by_product.get(similar_product["item_id"], [])
 
         return products_with_reviews
 
@@ -142,7 +148,7 @@ class ProductContextAgent:
         if product_embedding:
             # Handle JSON-encoded embeddings from database
             if isinstance(product_embedding, str):
-                product_embedding = json.loads(product_embedding)
+                product_embedding = json_loads(product_embedding)
             return product_embedding
         else:
             # Generate embedding on-the-fly
@@ -222,7 +228,7 @@ Analyze this product thoroughly. Extract the most important insights for generat
             "product_stats": product_stats,
             "review_count": len(reviews),
             "reviews": review_summary,
-            "format_instructions": self.parser.get_format_instructions(),
+            "format_instructions": self.format_instructions,
         })
 
         # Parse and validate response
@@ -332,7 +338,7 @@ Remember: The target product is new, so base your analysis on its description co
             "product_stats": product_stats,
             "similar_products": similar_product_list,
             "reviews": review_summary,
-            "format_instructions": self.parser.get_format_instructions(),
+            "format_instructions": self.format_instructions,
         })
 
         # Parse and validate response
@@ -404,7 +410,7 @@ Based ONLY on the description and stats, generate plausible:
             "brand": product.get("brand", "Unknown"),
             "description": product.get("description", "No description available"),
             "product_stats": product_stats,
-            "format_instructions": self.parser.get_format_instructions(),
+            "format_instructions": self.format_instructions,
         })
 
         # Parse and validate response
@@ -439,9 +445,6 @@ Based ONLY on the description and stats, generate plausible:
         Returns:
             Sorted list of reviews (best first)
         """
-        from datetime import datetime, timezone
-        import math
-
         if not reviews:
             return []
 
@@ -525,9 +528,6 @@ Based ONLY on the description and stats, generate plausible:
         Returns:
             Sorted list of reviews (best first)
         """
-        from datetime import datetime, timezone
-        import math
-
         if not reviews:
             return []
 
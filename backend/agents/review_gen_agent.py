@@ -14,13 +14,11 @@ Star Rating Logic:
 - "bad" band → 2 options (2 star, 1 star)
 """
 
-from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
-from config import settings
-import json
+from utils import json_dumps
+from .llm import shared_chat_llm, structured_output
 
 
 class SentimentAnalysis(BaseModel):
@@ -94,20 +92,73 @@ class ReviewOptions(BaseModel):
     sentiment_band: str = Field(description="Sentiment band: good/okay/bad")
 
 
+# Static prompt templates, compiled once at import
+_SENTIMENT_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """You are a sentiment analysis expert. Analyze survey responses to classify overall user sentiment.
+
+Sentiment Bands:
+- "good": User is satisfied, mostly positive feedback, likely to recommend
+- "okay": Mixed feelings, some positives and negatives, neutral overall
+- "bad": Dissatisfied, mostly negative feedback, significant concerns
+
+Be accurate and consider:
+- Explicit positive/negative statements
+- Tone of responses
+- Presence of critical issues vs minor concerns
+- Overall satisfaction indicators""",
+        ),
+        (
+            "human",
+            """Product: {product_title}
+
+Survey Responses:
+{survey_qa}
+
+Analyze the sentiment and classify into 'good', 'okay', or 'bad' band.""",
+        ),
+    ]
+)
+
+_WRITING_STYLE_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """You are a writing style analysis expert. Analyze the user's previous reviews to identify their unique writing patterns.
+
+Pay attention to:
+- Average length and detail level
+- Common phrases or expressions they use
+- Tone (formal/casual, enthusiastic/measured, etc.)
+- Vocabulary complexity
+- Sentence structure patterns
+- Unique stylistic elements
+
+This analysis will be used to generate new reviews that match the user's natural writing style.""",
+        ),
+        (
+            "human",
+            """Analyze these previous reviews written by the user:
+
+{reviews_text}
+
+Total reviews analyzed: {review_count}""",
+        ),
+    ]
+)
+
+
 class ReviewGenAgent:
     """Agent 4: Generates intelligent review options based on survey responses"""
 
     def __init__(self):
-        self.llm = ChatOpenAI(
-            model=settings.openai_model,
-            temperature=settings.openai_temperature,
-            api_key=settings.openai_api_key,
-        )
-        self.sentiment_parser = PydanticOutputParser(pydantic_object=SentimentAnalysis)
-        self.writing_style_parser = PydanticOutputParser(
-            pydantic_object=WritingStyleAnalysis
-        )
-        self.review_parser = PydanticOutputParser(pydantic_object=ReviewOptions)
+        self.llm = shared_chat_llm
+        # Native function calling - responses arrive validated against each schema
+        self.sentiment_llm = structured_output(self.llm, SentimentAnalysis)
+        self.writing_style_llm = structured_output(self.llm, WritingStyleAnalysis)
+        self.review_llm = structured_output(self.llm, ReviewOptions)
 
     def generate_reviews(
         self,
@@ -171,43 +222,11 @@ class ReviewGenAgent:
             ]
         )
 
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    """You are a sentiment analysis expert. Analyze survey responses to classify overall user sentiment.
-
-Sentiment Bands:
-- "good": User is satisfied, mostly positive feedback, likely to recommend
-- "okay": Mixed feelings, some positives and negatives, neutral overall
-- "bad": Dissatisfied, mostly negative feedback, significant concerns
-
-Be accurate and consider:
-- Explicit positive/negative statements
-- Tone of responses
-- Presence of critical issues vs minor concerns
-- Overall satisfaction indicators""",
-                ),
-                (
-                    "human",
-                    """Product: {product_title}
-
-Survey Responses:
-{survey_qa}
-
-Analyze the sentiment and classify into 'good', 'okay', or 'bad' band.
-
-{format_instructions}""",
-                ),
-            ]
-        )
-
-        chain = prompt | self.llm | self.sentiment_parser
+        chain = _SENTIMENT_PROMPT | self.sentiment_llm
         sentiment = chain.invoke(
             {
                 "product_title": product_title,
                 "survey_qa": qa_text,
-                "format_instructions": self.sentiment_parser.get_format_instructions(),
             }
         )
 
@@ -233,71 +252,17 @@ Analyze the sentiment and classify into 'good', 'okay', or 'bad' band.
             ]
         )
 
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    """You are a writing style analysis expert. Analyze the user's previous reviews to identify their unique writing patterns.
-
-Pay attention to:
-- Average length and detail level
-- Common phrases or expressions they use
-- Tone (formal/casual, enthusiastic/measured, etc.)
-- Vocabulary complexity
-- Sentence structure patterns
-- Unique stylistic elements
-
-This analysis will be used to generate new reviews that match the user's natural writing style.""",
-                ),
-                (
-                    "human",
-                    """Analyze these previous reviews written by the user:
-
-{reviews_text}
-
-Total reviews analyzed: {review_count}
-
-{format_instructions}""",
-                ),
-            ]
-        )
-
-        chain = prompt | self.llm
-        response = chain.invoke(
-            {
-                "reviews_text": reviews_text,
-                "review_count": len(user_reviews),
-                "format_instructions": self.writing_style_parser.get_format_instructions(),
-            }
-        )
-
-        # Parse the response manually to handle potential wrapper fields
+        chain = _WRITING_STYLE_PROMPT | self.writing_style_llm
         try:
-            import json
-
-            response_text = response.content if hasattr(response, "content") else str(response)
-
-            # Strip markdown code block wrappers if present (```json\n...\n```)
-            if response_text.startswith("```"):
-                first_newline = response_text.find("\n")
-                last_backticks = response_text.rfind("```")
-                if first_newline != -1 and last_backticks != -1:
-                    response_text = response_text[first_newline + 1:last_backticks].strip()
-
-            json_obj = json.loads(response_text)
-
-            # If the LLM wrapped the response with extra fields, extract the actual data
-            # Common wrapper patterns: {"description": "...", ...actual_fields}
-            if "description" in json_obj and len(json_obj) > 6:
-                # Remove the description field and use the rest
-                json_obj = {k: v for k, v in json_obj.items() if k != "description"}
-
-            # Now validate with Pydantic
-            writing_style = WritingStyleAnalysis(**json_obj)
-            return writing_style
+            return chain.invoke(
+                {
+                    "reviews_text": reviews_text,
+                    "review_count": len(user_reviews),
+                }
+            )
 
         except Exception as e:
-            # If parsing fails, return a default writing style analysis
+            # If analysis fails, return a default writing style analysis
             print(f"Warning: Failed to parse writing style analysis: {e}")
             return WritingStyleAnalysis(
                 has_previous_reviews=True,
@@ -380,9 +345,7 @@ Each review should:
 4. Have appropriate length (50-150 words)
 5. Match the assigned star rating in tone
 6. Incorporate specific details from the survey
-7. {writing_style_instruction}
-
-{format_instructions}""",
+7. {writing_style_instruction}""",
                 ),
             ]
         )
@@ -400,7 +363,7 @@ Each review should:
             writing_style_section = "User's Writing Style: No previous reviews available"
             writing_style_instruction = "Use natural, conversational language typical of online reviews"
 
-        chain = prompt | self.llm | self.review_parser
+        chain = prompt | self.review_llm
         reviews = chain.invoke(
             {
                 "product_title": product_title,
@@ -409,13 +372,12 @@ Each review should:
                 "positive_points": ", ".join(sentiment.key_positive_points),
                 "negative_points": ", ".join(sentiment.key_negative_points),
                 "overall_satisfaction": sentiment.overall_satisfaction,
-                "product_context": json.dumps(product_context, indent=2),
-                "customer_context": json.dumps(customer_context, indent=2),
+                "product_context": json_dumps(product_context, indent=True),
+                "customer_context": json_dumps(customer_context, indent=True),
                 "writing_style_section": writing_style_section,
                 "writing_style_instruction": writing_style_instruction,
                 "num_reviews": len(star_ratings),
                 "star_ratings": ", ".join([f"{s} stars" for s in star_ratings]),
-                "format_instructions": self.review_parser.get_format_instructions(),
             }
         )
 
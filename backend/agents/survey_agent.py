@@ -3,24 +3,30 @@ Agent 3: Survey generation with adaptive questioning.
 Reviews handled by Agent 4.
 """
 
-from langgraph.graph import StateGraph, END
-from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any, TypedDict, Annotated, Sequence, Optional
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Dict, Any, Sequence, Optional, Set, Tuple, Iterator, AsyncIterator
 from typing_extensions import TypedDict
-import operator
 from config import settings
-from database import db
+from database import db, RedisSessionStore
+from .llm import shared_chat_llm, structured_output, partial_structured_output
 from .product_context_agent import product_context_agent, ProductContext
 from .customer_context_agent import customer_context_agent, CustomerContext
-import json
-from datetime import datetime
+from utils import json_dumps
+from datetime import datetime, timezone
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from itertools import chain
+from operator import itemgetter
+from collections import OrderedDict
+from threading import Event, Lock
 import asyncio
+import copy
+import time
 
 
 class SurveyQuestion(BaseModel):
+    """A single multiple-choice survey question"""
     question_text: str = Field(description="The question to ask the user")
     options: List[str] = Field(description="4-6 multiple choice options")
     allow_multiple: bool = Field(description="True if multiple options can be selected")
@@ -28,16 +34,29 @@ class SurveyQuestion(BaseModel):
 
 
 class SurveyQuestionnaire(BaseModel):
+    """A batch of survey questions to present to the user"""
     questions: List[SurveyQuestion] = Field(description="List of 3-5 survey questions")
     survey_goal: str = Field(description="Overall goal of this survey batch")
 
 
+def _prompt_cache_options(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Request options that route a session's calls to the same OpenAI prompt cache
+
+    Every survey prompt starts with the frozen product/customer contexts, which
+    are fixed per user and product, so that pair keys the cached prefix.
+    """
+    return {"extra_body": {"prompt_cache_key": f"survey:{state['user_id']}:{state['item_id']}"}}
+
+
 class SurveyState(TypedDict):
     session_id: str
     user_id: str
     item_id: str
     product_context: Optional[Dict[str, Any]]
     customer_context: Optional[Dict[str, Any]]
+    product_context_json: str  # Prompt serialization, computed once per session (not persisted)
+    customer_context_json: str  # Prompt serialization, computed once per session (not persisted)
     all_questions: List[Dict[str, Any]]
     current_question_index: int
     answers: List[Dict[str, Any]]
@@ -46,96 +65,232 @@ class SurveyState(TypedDict):
     skipped_questions: List[int]
     consecutive_skips: int
     asked_question_texts: List[str]
-    conversation_history: Annotated[Sequence[Dict[str, str]], operator.add]
+    asked_question_texts_set: Set[str]  # O(1) membership companion (not persisted)
+    question_text_keys: Set[str]  # Normalized texts of all_questions for dedupe (not persisted)
+    answers_summary: str  # Prompt block of previous Q&A, built incrementally (not persisted)
+    skipped_summary: str  # Prompt block of skipped question texts, built incrementally (not persisted)
+    answer_by_question_index: Dict[int, str]  # question_index -> answer text for edits (not persisted)
+    conversation_history: List[Dict[str, str]]
     next_action: str
 
 
-class SurveyAgent:
+# Derived lookup structures kept alongside the session state - rebuilt from the
+# persisted fields when missing and stripped before writing session_context
+_TRANSIENT_STATE_KEYS = frozenset({
+    "asked_question_texts_set",
+    "question_text_keys",
+    "product_context_json",
+    "customer_context_json",
+    "answers_summary",
+    "skipped_summary",
+    "answer_by_question_index",
+})
 
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model=settings.openai_model,
-            temperature=settings.openai_temperature,
-            api_key=settings.openai_api_key,
-        )
-        self.graph = self._build_graph()
-        # In-memory session state cache (session_id -> state dict)
-        # Avoids database writes on every answer
-        self._session_state_cache: Dict[str, Dict[str, Any]] = {}
 
-    def _log_event_async(
-        self,
-        session_id: str,
-        event_type: str,
-        event_detail: Optional[Dict[str, Any]] = None
-    ) -> None:
-        """
-        Fire-and-forget async event logging
+# Number of most recent asked questions listed verbatim in the follow-up prompt
+_PROMPT_RECENT_ASKED_QUESTIONS = 8
 
-        Non-blocking - errors are logged but don't crash user flow.
-        Events are logged to survey_details table for analytics.
+# Upper bound on waiting for a prefetched follow-up batch before regenerating it
+_FOLLOWUP_PREFETCH_TIMEOUT_SECONDS = 30
 
-        Args:
-            session_id: Session UUID
-            event_type: Event type (question_generated, answer_submitted, etc.)
-            event_detail: Optional JSONB event data
-        """
-        async def _log():
-            try:
-                await db.insert_survey_detail_async(session_id, event_type, event_detail)
-            except Exception as e:
-                print(f"Background event log failed ({event_type}): {e}")
-
-        # Fire-and-forget
-        asyncio.create_task(_log())
-
-    def _build_graph(self) -> StateGraph:
-        workflow = StateGraph(SurveyState)
-        workflow.add_node("fetch_contexts", self._fetch_contexts)
-        workflow.add_node("generate_initial_questions", self._generate_initial_questions)
-        workflow.add_node("present_question", self._present_question)
-        workflow.set_entry_point("fetch_contexts")
-        workflow.add_edge("fetch_contexts", "generate_initial_questions")
-        workflow.add_edge("generate_initial_questions", "present_question")
-        workflow.add_conditional_edges(
-            "present_question",
-            self._route_after_question,
-            {"wait_for_answer": END, "complete_survey": END},
-        )
-        return workflow.compile()
+# Upper bound on waiting for the rest of a streaming initial batch
+_INITIAL_QUESTIONS_TIMEOUT_SECONDS = 30
 
-    def _fetch_contexts(self, state: SurveyState) -> Dict[str, Any]:
-        """
-        Legacy node - contexts are now fetched in start_survey() before graph invocation.
-        This node is skipped by setting next_action="generate_initial_questions".
-        Kept for backwards compatibility with LangGraph structure.
-        """
-        # Contexts already in state from start_survey()
-        # Just return them with conversation_history
-        return {
-            "product_context": state.get("product_context", {}),
-            "customer_context": state.get("customer_context", {}),
-            "conversation_history": [
-                {
-                    "role": "system",
-                    "content": f"Product Context: {json.dumps(state.get('product_context', {}), indent=2)}\n\n"
-                    f"Customer Context: {json.dumps(state.get('customer_context', {}), indent=2)}",
-                }
-            ],
-        }
 
-    def _generate_initial_questions(self, state: SurveyState) -> Dict[str, Any]:
-        parser = PydanticOutputParser(pydantic_object=SurveyQuestionnaire)
+def _utc_now_iso() -> str:
+    """Current UTC time as an ISO-8601 string (millisecond precision, explicit offset)"""
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
 
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    """You are an expert survey designer. Generate personalized survey questions based on:
-1. Product context (features, concerns, pros/cons)
-2. Customer context (expectations, pain points, motivations)
 
-Create {num_questions} engaging multiple-choice questions that will help understand the user's experience and generate an authentic review.
+def _format_answer_entry(position: int, answer: Dict[str, Any]) -> str:
+    """One Q&A pair as it appears in the follow-up prompt"""
+    return f"Q{position}: {answer['question']}\nA: {answer['answer']}"
+
+
+def _format_answers_summary(answers: Sequence[Dict[str, Any]]) -> str:
+    """Full previous Q&A prompt block (used when there is no running summary)"""
+    return "\n".join(_format_answer_entry(i + 1, ans) for i, ans in enumerate(answers))
+
+
+def _drop_trailing_answer_entries(
+    summary: str,
+    removed: Sequence[Dict[str, Any]],
+    first_position: int
+) -> Optional[str]:
+    """
+    Strip the entries of answers cut from the end of a running answers summary
+
+    Returns:
+        The shortened summary, or None if it doesn't end with those entries
+    """
+    if not removed:
+        return summary
+    tail = "\n".join(_format_answer_entry(first_position + i, ans) for i, ans in enumerate(removed))
+    if summary == tail:
+        return ""
+    if summary.endswith("\n" + tail):
+        return summary[:-len(tail) - 1]
+    return None
+
+
+def _format_skipped_entry(question: Dict[str, Any]) -> str:
+    """One skipped question as it appears in the follow-up prompt"""
+    return f"- {question['question_text']}"
+
+
+def _format_skipped_summary(all_questions: Sequence[Dict[str, Any]], skipped: Sequence[int]) -> str:
+    """Full skipped-questions prompt block (used when there is no running summary)"""
+    return "\n".join(_format_skipped_entry(all_questions[idx]) for idx in skipped if idx < len(all_questions))
+
+
+def _append_line(block: str, line: str) -> str:
+    """Append a line to a newline-joined prompt block"""
+    return f"{block}\n{line}" if block else line
+
+
+def _followup_batch_size(state: Dict[str, Any]) -> int:
+    """Follow-up questions to request next (at most 2, within the survey's question budget)"""
+    return min(2, settings.max_survey_questions - state["total_questions_asked"])
+
+
+def _valid_question(raw: Any) -> Optional[Dict[str, Any]]:
+    """Validate one streamed question; None (with a warning) if it is unusable"""
+    try:
+        question = SurveyQuestion.model_validate(raw)
+    except ValidationError as e:
+        print(f"WARNING: Malformed question, skipping: {e}")
+        return None
+    # Ensure question has at least 2 options (probe the model - only dump keepers)
+    if len(question.options) < 2:
+        print(f"WARNING: Question has insufficient options, skipping: {question.question_text}")
+        return None
+    return question.model_dump()
+
+
+def _normalize_question_text(text: str) -> str:
+    """Comparison key for spotting repeated question wording"""
+    return text.strip().lower()
+
+
+def _drop_repeated_questions(
+    questions: List[Dict[str, Any]],
+    existing_texts: Set[str]
+) -> List[Dict[str, Any]]:
+    """
+    Filter out questions already in the survey or repeated within the batch
+
+    Args:
+        questions: Newly generated question dicts
+        existing_texts: Normalized texts of questions already in the survey
+
+    Returns:
+        Questions whose wording has not been seen before
+    """
+    batch_texts = set()
+    unique_questions = []
+    for q in questions:
+        key = _normalize_question_text(q["question_text"])
+        if key in existing_texts or key in batch_texts:
+            print(f"WARNING: Dropping repeated question: {q['question_text']}")
+            continue
+        batch_texts.add(key)
+        unique_questions.append(q)
+    return unique_questions
+
+
+# State lists _process_answer appends to in place
+_IN_PLACE_STATE_LISTS = ("answers", "skipped_questions", "conversation_history")
+
+
+def _list_lengths(state: Dict[str, Any]) -> Dict[str, int]:
+    """Checkpoint the in-place state lists before a turn mutates them"""
+    return {key: len(state[key]) for key in _IN_PLACE_STATE_LISTS if state.get(key) is not None}
+
+
+def _truncate_lists(state: Dict[str, Any], lengths: Dict[str, int]) -> None:
+    """Roll the in-place state lists back to a _list_lengths() checkpoint"""
+    for key, length in lengths.items():
+        del state[key][length:]
+    # May hold the rolled-back answer - rebuilt on next use
+    state.pop("answer_by_question_index", None)
+
+
+_answer_index_item = itemgetter("question_index", "answer")
+
+
+def _build_answer_index(answers: List[Dict[str, Any]]) -> Dict[int, str]:
+    """question_index -> answer text for a list of answer records"""
+    return dict(map(_answer_index_item, answers))
+
+
+def _answer_index(state: Dict[str, Any]) -> Dict[int, str]:
+    """question_index -> answer text lookup, rebuilt from the answers list when missing"""
+    answer_index = state.get("answer_by_question_index")
+    if answer_index is None:
+        answer_index = _build_answer_index(state["answers"])
+        state["answer_by_question_index"] = answer_index
+    return answer_index
+
+
+def _persistable_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a JSON-safe copy of survey state without transient lookup fields"""
+    return {key: value for key, value in state.items() if key not in _TRANSIENT_STATE_KEYS}
+
+
+def _restore_transient_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild the prompt serializations for a state reloaded from session_context"""
+    state["product_context_json"] = json_dumps(state["product_context"], indent=True, sort_keys=True)
+    state["customer_context_json"] = json_dumps(state["customer_context"], indent=True, sort_keys=True)
+    # The lookup sets and the answers/skipped summaries are rebuilt lazily on first use
+    return state
+
+
+# Lookup sets (and int-keyed maps) can't be MessagePack-encoded - they are left
+# out of the shared session store and rebuilt from their lists on first use
+_SHARED_STORE_EXCLUDED_KEYS = frozenset({
+    "asked_question_texts_set",
+    "question_text_keys",
+    "answer_by_question_index",
+})
+
+
+def _shareable_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Return survey state without the lookup sets and maps, for the shared session store"""
+    return {key: value for key, value in state.items() if key not in _SHARED_STORE_EXCLUDED_KEYS}
+
+
+# Bounds for the in-memory survey state store - idle sessions (closed tabs) are
+# evicted and flushed to session_context so a returning user can still resume
+SESSION_STATE_TTL_SECONDS = 3600.0
+SESSION_STATE_MAX_ENTRIES = 10_000
+
+# Event log batching - survey_details rows are written by one background task
+# in multi-row INSERTs instead of one round-trip per event. The queue is
+# bounded: if the database falls behind, the oldest pending events are dropped
+EVENT_BATCH_MAX_SIZE = 100
+EVENT_FLUSH_INTERVAL_SECONDS = 0.2
+EVENT_QUEUE_MAX_SIZE = 8192
+
+
+# Prompt templates are static, so they are compiled once at import.
+# Prompt layout keeps the frozen product/customer contexts as a byte-identical
+# prefix (nothing per-call is interpolated before them) so provider prompt
+# caching can reuse it; everything that varies lives in the human message.
+_INITIAL_QUESTIONS_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """Product Context:
+{product_context}
+
+Customer Context:
+{customer_context}
+
+You are an expert survey designer. Generate personalized survey questions based on:
+1. Product context above (features, concerns, pros/cons)
+2. Customer context above (expectations, pain points, motivations)
+
+Create engaging multiple-choice questions that will help understand the user's experience and generate an authentic review.
 
 Guidelines:
 - Questions should be specific and actionable
@@ -153,68 +308,431 @@ CRITICAL GUARDRAILS:
 - If a question allows multiple choices and conceptually could have "All of the above", include it as the last option
 - If appropriate, include "Other" as the last option to allow user input for unlisted choices
 - Track previously asked questions to ensure no repetition throughout the survey""",
-                ),
-                (
-                    "human",
-                    """Product Context:
+        ),
+        (
+            "human",
+            """Generate {num_questions} initial survey questions. Each question should have 4-6 options.""",
+        ),
+    ]
+)
+
+
+# Same stable-prefix layout as the initial prompt: frozen contexts first,
+# per-turn Q&A / skip state only in the human message
+_FOLLOWUP_QUESTIONS_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            """Product Context:
 {product_context}
 
 Customer Context:
 {customer_context}
 
-Generate {num_questions} initial survey questions. Each question should have 4-6 options.
+You are an expert survey designer conducting an adaptive survey.
+Based on the user's previous answers, generate relevant follow-up questions.
 
-{format_instructions}""",
-                ),
-            ]
-        )
+Guidelines:
+- Build on previous answers to dig deeper
+- Explore interesting angles from their responses
+- Keep questions focused and specific
+- Ensure questions flow naturally from the conversation
+- Help gather insights for an authentic review
+- Set allow_multiple=true for questions where multiple options can logically be selected together
+- Set allow_multiple=false for mutually exclusive questions
+
+CRITICAL GUARDRAILS:
+- NEVER repeat questions - check asked_questions list and ensure each question is unique
+- NEVER repeat options across questions - ensure option diversity
+- Options within a question must be mutually distinct (no similar/overlapping options)
+- If user has been skipping questions, generate more relevant and specific questions
+- Pay attention to skipped questions - they indicate topics the user finds irrelevant
+- If a question allows multiple choices and conceptually could have "All of the above", include it as the last option
+- If appropriate, include "Other" as the last option to allow user input""",
+        ),
+        (
+            "human",
+            """Previous Q&A:
+{previous_qa}
+
+Already Asked Questions (DO NOT REPEAT):
+{asked_questions}
+{skipped_context}
+
+Skipped Questions Count: {skipped_count}
+Consecutive Skips: {consecutive_skips}
+
+Generate {num_questions} follow-up questions that build on the conversation.
+CRITICAL: If user has been skipping questions, AVOID topics similar to skipped questions.
+Focus on topics the user HAS engaged with through their answers.
+Make questions more specific, relevant, and actionable based on their actual responses.{repeat_warning}""",
+        ),
+    ]
+)
+
+
+class _SessionLock:
+    """A session's turn lock and the number of turns holding or waiting on it"""
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
 
-        chain = prompt | self.llm | parser
 
-        questionnaire = chain.invoke(
+class SurveyAgent:
+
+    def __init__(self):
+        self.llm = shared_chat_llm
+        # Routing thresholds, resolved once - _route_after_answer runs on every answer
+        self._complete_at_answered = min(settings.min_answered_questions, settings.max_answered_questions)
+        self._max_total_questions = settings.max_survey_questions
+        # Worker pool for blocking background work (streaming initial batches, evicted state flushes)
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="survey-agent")
+        # In-memory session state cache (session_id -> (expires_at, state dict))
+        # Avoids database writes on every answer; LRU order, oldest first
+        self._session_state_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._session_state_lock = Lock()
+        # Optional shared store (REDIS_URL) - replaces the in-process cache so any
+        # worker can serve any session
+        self._shared_store: Optional[RedisSessionStore] = None
+        if settings.redis_url:
+            try:
+                self._shared_store = RedisSessionStore(settings.redis_url, SESSION_STATE_TTL_SECONDS)
+            except ValueError as e:
+                print(f"WARNING: {e} - keeping survey state in process memory")
+        # Pending survey_details rows and their writer task, created on first use
+        # inside the running event loop
+        self._event_queue: Optional[asyncio.Queue] = None
+        self._event_writer: Optional[asyncio.Task] = None
+        self._dropped_events = 0
+        # Initial batches still streaming after their first question was served (session_id -> future)
+        self._initial_questions_pending: Dict[str, Future] = {}
+        # Speculative follow-up batches (session_id -> ((question_index, answered_count), task))
+        self._followup_prefetch: Dict[str, Tuple[Tuple[int, int], asyncio.Task]] = {}
+        # Serializes turns of one session - submit/skip/edit await the LLM between
+        # loading and storing its state. Only sessions with a turn in flight have
+        # an entry (session_id -> lock and its holder + waiter count)
+        self._session_locks: Dict[str, _SessionLock] = {}
+
+    @asynccontextmanager
+    async def _session_turn(self, session_id: str) -> AsyncIterator[None]:
+        """Hold a session's lock from loading its state until storing or dropping it"""
+        entry = self._session_locks.get(session_id)
+        if entry is None:
+            entry = self._session_locks[session_id] = _SessionLock()
+        entry.users += 1
+        try:
+            async with entry.lock:
+                yield
+        finally:
+            entry.users -= 1
+            # Last holder/waiter gone - no later turn can be queued on this lock
+            if not entry.users:
+                del self._session_locks[session_id]
+
+    def _get_session_state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached state for a session and refresh its idle TTL"""
+        if self._shared_store is not None:
+            return self._shared_store.get(session_id)
+
+        now = time.monotonic()
+        with self._session_state_lock:
+            entry = self._session_state_cache.get(session_id)
+            if entry is None:
+                return None
+            # An idle-expired entry that _put_session_state hasn't swept yet is
+            # still the newest copy (session_context may not hold it) - revive it
+            state = entry[1]
+            self._session_state_cache[session_id] = (now + SESSION_STATE_TTL_SECONDS, state)
+            self._session_state_cache.move_to_end(session_id)
+        self._wait_for_initial_questions(session_id)
+        return state
+
+    def _wait_for_initial_questions(self, session_id: str) -> None:
+        """Block until a session's initial batch has finished streaming into its state"""
+        pending = self._initial_questions_pending.pop(session_id, None)
+        if pending is None:
+            return
+        try:
+            pending.result(timeout=_INITIAL_QUESTIONS_TIMEOUT_SECONDS)
+        except Exception as e:
+            print(f"WARNING: Initial questions still incomplete for {session_id}: {e}")
+
+    def _load_session_state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return a session's state from the cache, resuming it from session_context if it was evicted"""
+        state = self._get_session_state(session_id)
+        if state is not None:
+            return state
+
+        session = db.get_survey_session(session_id)
+        # Completed sessions keep their final state in session_context too - only resume open ones
+        if not session or session.get("questions_and_answers") or not session.get("session_context"):
+            return None
+        # Deep copy - the row is shared with the db session cache and the state is mutated in place
+        state = _restore_transient_state(copy.deepcopy(session["session_context"]))
+        self._put_session_state(session_id, state)
+        return state
+
+    async def _aload_session_state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """_load_session_state without blocking the event loop on the LLM or the database"""
+        if self._shared_store is not None:
+            return await asyncio.to_thread(self._load_session_state, session_id)
+
+        pending = self._initial_questions_pending.get(session_id)
+        if pending is not None:
+            done, _ = await asyncio.wait(
+                [asyncio.wrap_future(pending)], timeout=_INITIAL_QUESTIONS_TIMEOUT_SECONDS
+            )
+            # Waited here already - _get_session_state must not block the loop on it again
+            if self._initial_questions_pending.get(session_id) is pending:
+                del self._initial_questions_pending[session_id]
+            if not done:
+                print(f"WARNING: Initial questions still incomplete for {session_id}: timed out")
+
+        state = self._get_session_state(session_id)
+        if state is not None:
+            return state
+        return await asyncio.to_thread(self._load_session_state, session_id)
+
+    def _put_session_state(self, session_id: str, state: Dict[str, Any]) -> None:
+        """Cache a session's state, evicting expired and least recently used sessions"""
+        if self._shared_store is not None:
+            self._shared_store.set(session_id, _shareable_state(state))
+            return
+
+        now = time.monotonic()
+        evicted = []
+        with self._session_state_lock:
+            self._session_state_cache[session_id] = (now + SESSION_STATE_TTL_SECONDS, state)
+            self._session_state_cache.move_to_end(session_id)
+            while self._session_state_cache:
+                oldest_id, (expires_at, oldest_state) = next(iter(self._session_state_cache.items()))
+                if expires_at > now and len(self._session_state_cache) <= SESSION_STATE_MAX_ENTRIES:
+                    break
+                del self._session_state_cache[oldest_id]
+                evicted.append((oldest_id, oldest_state))
+        self._flush_evicted_states(evicted)
+
+    async def _aput_session_state(self, session_id: str, state: Dict[str, Any]) -> None:
+        """_put_session_state without blocking the event loop on the shared store"""
+        if self._shared_store is not None:
+            await asyncio.to_thread(self._put_session_state, session_id, state)
+        else:
+            self._put_session_state(session_id, state)
+
+    async def _adrop_session_state(self, session_id: str) -> None:
+        """_drop_session_state without blocking the event loop on the shared store"""
+        if self._shared_store is not None:
+            await asyncio.to_thread(self._drop_session_state, session_id)
+        else:
+            self._drop_session_state(session_id)
+
+    def _drop_session_state(self, session_id: str) -> None:
+        """Forget a finished session's state and any speculative work for it"""
+        if self._shared_store is not None:
+            self._shared_store.delete(session_id)
+        with self._session_state_lock:
+            self._session_state_cache.pop(session_id, None)
+        self._initial_questions_pending.pop(session_id, None)
+        self._cancel_followup_prefetch(session_id)
+
+    def _cancel_followup_prefetch(self, session_id: str) -> None:
+        """Discard a session's speculative follow-up batch and cancel its LLM call"""
+        entry = self._followup_prefetch.pop(session_id, None)
+        if entry is None:
+            return
+        task = entry[1]
+        # Evictions can run off the event loop (state reloads in worker threads)
+        try:
+            task.get_loop().call_soon_threadsafe(task.cancel)
+        except RuntimeError:
+            pass  # Loop already closed - the task died with it
+
+    def _flush_evicted_states(self, evicted: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Persist evicted in-progress states to session_context in the background"""
+        for session_id, state in evicted:
+            self._initial_questions_pending.pop(session_id, None)
+            self._cancel_followup_prefetch(session_id)
+
+            def _flush(session_id=session_id, state=state):
+                try:
+                    db.update_session_context(session_id, _persistable_state(state))
+                except Exception as e:
+                    print(f"WARNING: Failed to persist evicted session state {session_id}: {e}")
+
+            self._executor.submit(_flush)
+
+    def _log_event_async(
+        self,
+        session_id: str,
+        event_type: str,
+        event_detail: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Fire-and-forget async event logging
+
+        Non-blocking - errors are logged but don't crash user flow.
+        Events are queued and written to survey_details in batches for analytics.
+
+        Args:
+            session_id: Session UUID
+            event_type: Event type (question_generated, answer_submitted, etc.)
+            event_detail: Optional JSONB event data
+        """
+        loop = asyncio.get_running_loop()
+        if self._event_writer is None or self._event_writer.get_loop() is not loop:
+            self._event_queue = asyncio.Queue(maxsize=EVENT_QUEUE_MAX_SIZE)
+        if self._event_writer is None or self._event_writer.done() or self._event_writer.get_loop() is not loop:
+            self._event_writer = loop.create_task(self._write_events(self._event_queue))
+
+        if self._event_queue.full():
+            # Analytics events are best-effort - shed the oldest rather than block the survey
+            self._event_queue.get_nowait()
+            self._event_queue.task_done()
+            self._dropped_events += 1
+        self._event_queue.put_nowait({
+            "session_id": session_id,
+            "event_type": event_type,
+            "event_detail": event_detail,
+        })
+
+    async def _write_events(self, queue: asyncio.Queue) -> None:
+        """Background writer: drain queued events into bulk INSERTs"""
+        while True:
+            if queue.empty():
+                batch = [await queue.get()]
+                # Let a burst of events (answer + follow-up questions) accumulate
+                await asyncio.sleep(EVENT_FLUSH_INTERVAL_SECONDS)
+            else:
+                # Backlog left over from the last batch - write it straight away
+                batch = [queue.get_nowait()]
+            while len(batch) < EVENT_BATCH_MAX_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+            if self._dropped_events:
+                print(f"WARNING: Event queue full, dropped {self._dropped_events} oldest events")
+                self._dropped_events = 0
+            try:
+                await db.insert_survey_details_bulk_async(batch)
+            except Exception as e:
+                print(f"Background event log failed ({len(batch)} events): {e}")
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def flush_events(self) -> None:
+        """Wait until every queued event has been written (e.g. on shutdown)"""
+        if self._event_queue is not None and self._event_writer is not None and not self._event_writer.done():
+            await self._event_queue.join()
+
+    def _stream_initial_questions(self, state: SurveyState) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the initial questions one at a time as the LLM streams them
+
+        A streamed question is only complete once the next one has started (or
+        the stream has ended), so truncated partial objects are never emitted.
+        """
+        chain = _INITIAL_QUESTIONS_PROMPT | partial_structured_output(
+            self.llm, SurveyQuestionnaire, **_prompt_cache_options(state)
+        )
+
+        questions: List[Any] = []
+        emitted = 0
+        for partial in chain.stream(
             {
-                "product_context": json.dumps(state["product_context"], indent=2),
-                "customer_context": json.dumps(state["customer_context"], indent=2),
+                "product_context": state["product_context_json"],
+                "customer_context": state["customer_context_json"],
                 "num_questions": settings.initial_questions_count,
-                "format_instructions": parser.get_format_instructions(),
             }
-        )
+        ):
+            questions = (partial or {}).get("questions") or questions
+            while emitted < len(questions) - 1:
+                question = _valid_question(questions[emitted])
+                emitted += 1
+                if question is not None:
+                    yield question
+
+        for raw in questions[emitted:]:
+            question = _valid_question(raw)
+            if question is not None:
+                yield question
+
+    async def _generate_initial_questions(
+        self,
+        state: SurveyState,
+        stop: Optional[Event] = None
+    ) -> Future:
+        """
+        Stream the initial batch into state["all_questions"] on the worker pool
 
-        # Convert questions to dict format and validate
-        questions = []
-        for q in questionnaire.questions:
-            q_dict = q.dict()
-            # Ensure question has at least 2 options
-            if not q_dict.get("options") or len(q_dict["options"]) < 2:
-                print(f"WARNING: Question has insufficient options, skipping: {q_dict.get('question_text')}")
-                continue
-            questions.append(q_dict)
+        Returns as soon as the first valid question is in place, so it can be
+        served while the rest of the batch is still generating. The returned
+        future completes once the whole batch has been appended, or once the
+        stream is abandoned after stop is set.
 
-        # If no valid questions, raise error
-        if not questions:
-            raise ValueError("No valid questions generated - all questions missing options")
+        Raises:
+            ValueError: If the batch yields no valid question
+        """
+        loop = asyncio.get_running_loop()
+        first_question = loop.create_future()
+
+        def _resolve(error: Optional[BaseException] = None) -> None:
+            if first_question.done():
+                return
+            if error is not None:
+                first_question.set_exception(error)
+            else:
+                first_question.set_result(None)
 
-        return {
-            "all_questions": questions,
-            "current_question_index": 0,
-            "total_questions_asked": 0,
-            "next_action": "ask_question",
-        }
+        def _generate() -> None:
+            # Appended in place - the session state owns this list
+            questions = state["all_questions"]
+            try:
+                for question in self._stream_initial_questions(state):
+                    if stop is not None and stop.is_set():
+                        return  # Closes the stream - nobody will read this state
+                    questions.append(question)
+                    if len(questions) == 1:
+                        loop.call_soon_threadsafe(_resolve)
+            except Exception as e:
+                if not questions:
+                    loop.call_soon_threadsafe(_resolve, e)
+                    return
+                # Already serving questions - keep the ones that arrived
+                print(f"WARNING: Initial question stream ended early after {len(questions)} questions: {e}")
+            if not questions:
+                loop.call_soon_threadsafe(
+                    _resolve, ValueError("No valid questions generated - all questions missing options")
+                )
+
+        pending = self._executor.submit(_generate)
+        await first_question
+        return pending
 
     def _present_question(self, state: SurveyState) -> Dict[str, Any]:
         """
         Node 3: Present current question to user
         Returns question for UI to display
         """
-        if state["current_question_index"] >= len(state["all_questions"]):
+        current_index = state["current_question_index"]
+        all_questions = state["all_questions"]
+        if current_index >= len(all_questions):
             # No more questions, survey complete - return to API (which will invoke Agent 4)
             return {"next_action": "complete_survey"}
 
-        current_q = state["all_questions"][state["current_question_index"]]
+        current_q = all_questions[current_index]
 
         # Track asked question to prevent repetition
-        asked_texts = list(state.get("asked_question_texts", []))
-        if current_q["question_text"] not in asked_texts:
+        # (extended in place - the session state owns this list, no copy needed)
+        asked_texts = state.get("asked_question_texts")
+        if asked_texts is None:
+            asked_texts = []
+        asked_set = state.get("asked_question_texts_set")
+        if asked_set is None:
+            asked_set = set(asked_texts)
+        if current_q["question_text"] not in asked_set:
+            asked_set.add(current_q["question_text"])
             asked_texts.append(current_q["question_text"])
 
         # Note: Questions are logged via question_generated events in survey_details table
@@ -223,219 +741,294 @@ Generate {num_questions} initial survey questions. Each question should have 4-6
         return {
             "total_questions_asked": state["total_questions_asked"] + 1,
             "asked_question_texts": asked_texts,
+            "asked_question_texts_set": asked_set,
             "next_action": "wait_for_answer",
         }
 
-    def _process_answer(self, state: SurveyState, answer, is_skipped: bool = False) -> Dict[str, Any]:
-        """Process user's answer or skip, update state"""
-        current_q = state["all_questions"][state["current_question_index"]]
+    def _process_answer(
+        self,
+        state: SurveyState,
+        answer,
+        is_skipped: bool = False,
+        timestamp: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Process user's answer or skip, update state
+
+        Ownership contract: the answers / skipped_questions / conversation_history
+        lists belong to the cached session state and are appended in place (no
+        per-turn copies), so only the scalar fields that changed are returned.
+        Callers take a _list_lengths() checkpoint first and _truncate_lists() if
+        the turn fails before the cache is updated.
+        """
+        current_index = state["current_question_index"]
+        current_q = state["all_questions"][current_index]
+
+        conversation_history = state.setdefault("conversation_history", [])
 
         if is_skipped:
-            skipped_list = list(state.get("skipped_questions", []))
-            skipped_list.append(state["current_question_index"])
+            skipped_questions = state.setdefault("skipped_questions", [])
+            skipped_summary = state.get("skipped_summary")
+            if skipped_summary is None:
+                skipped_summary = _format_skipped_summary(state["all_questions"], skipped_questions)
+            skipped_questions.append(current_index)
+            skipped_summary = _append_line(skipped_summary, _format_skipped_entry(current_q))
             consecutive_skips = state.get("consecutive_skips", 0) + 1
 
-            conversation_update = list(state.get("conversation_history", [])) + [
+            conversation_history.extend((
                 {"role": "assistant", "content": current_q["question_text"]},
                 {"role": "user", "content": "[SKIPPED - User found this question irrelevant to their feedback]"},
-            ]
+            ))
 
-            next_index = state["current_question_index"] + 1
+            next_index = current_index + 1
 
             return {
+                "skipped_summary": skipped_summary,
                 "current_question_index": next_index,
-                "skipped_questions": skipped_list,
                 "consecutive_skips": consecutive_skips,
-                "conversation_history": conversation_update,
             }
 
         answer_text = ", ".join(answer) if isinstance(answer, list) else answer
 
         answer_record = {
-            "question_index": state["current_question_index"],
+            "question_index": current_index,
             "question": current_q["question_text"],
             "answer": answer_text,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": timestamp or _utc_now_iso(),
         }
 
-        updated_answers = list(state["answers"]) + [answer_record]
+        # Running prompt summary - one entry per answer instead of a full re-join
+        answers_summary = state.get("answers_summary")
+        if answers_summary is None:
+            answers_summary = _format_answers_summary(state["answers"])
+
+        answers = state["answers"]
+        answers.append(answer_record)
+        # Only kept up to date once an edit has built it
+        answer_index = state.get("answer_by_question_index")
+        if answer_index is not None:
+            answer_index[current_index] = answer_text
+        answers_summary = _append_line(
+            answers_summary, _format_answer_entry(len(answers), answer_record)
+        )
 
-        conversation_update = list(state.get("conversation_history", [])) + [
+        conversation_history.extend((
             {"role": "assistant", "content": current_q["question_text"]},
             {"role": "user", "content": answer_text},
-        ]
+        ))
 
         consecutive_skips = 0
-        next_index = state["current_question_index"] + 1
+        next_index = current_index + 1
         # Increment answered questions count (excluding skips)
         answered_count = state.get("answered_questions_count", 0) + 1
 
         return {
-            "answers": updated_answers,
+            "answers_summary": answers_summary,
             "current_question_index": next_index,
             "answered_questions_count": answered_count,
             "consecutive_skips": consecutive_skips,
-            "conversation_history": conversation_update,
         }
 
-    def _generate_followup_questions(self, state: SurveyState) -> Dict[str, Any]:
+    async def _agenerate_followup_questions(
+        self,
+        state: SurveyState,
+        new_questions: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
         """Generate adaptive follow-up questions with skip context"""
-        if state["total_questions_asked"] >= settings.max_survey_questions:
+        # Gate before any LLM call - nothing to request once the question budget is spent
+        if _followup_batch_size(state) <= 0:
             return {"next_action": "complete_survey"}
 
-        parser = PydanticOutputParser(pydantic_object=SurveyQuestionnaire)
-
-        # Build answers summary including answered questions only
-        answers_summary = "\n".join(
-            [
-                f"Q{i+1}: {ans['question']}\nA: {ans['answer']}"
-                for i, ans in enumerate(state["answers"])
-            ]
-        )
-
-        # Build skipped questions context
-        skipped_questions = state.get("skipped_questions", [])
-        skipped_context = ""
-        if skipped_questions:
-            skipped_q_texts = []
-            all_qs = state.get("all_questions", [])
-            for idx in skipped_questions:
-                if idx < len(all_qs):
-                    skipped_q_texts.append(f"- {all_qs[idx]['question_text']}")
-            if skipped_q_texts:
-                skipped_context = "\n\nSkipped Questions (user found these irrelevant):\n" + "\n".join(skipped_q_texts)
-
-        prompt = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    """You are an expert survey designer conducting an adaptive survey.
-Based on the user's previous answers, generate {num_questions} relevant follow-up questions.
-
-Guidelines:
-- Build on previous answers to dig deeper
-- Explore interesting angles from their responses
-- Keep questions focused and specific
-- Ensure questions flow naturally from the conversation
-- Help gather insights for an authentic review
-- Set allow_multiple=true for questions where multiple options can logically be selected together
-- Set allow_multiple=false for mutually exclusive questions
-
-CRITICAL GUARDRAILS:
-- NEVER repeat questions - check asked_questions list and ensure each question is unique
-- NEVER repeat options across questions - ensure option diversity
-- Options within a question must be mutually distinct (no similar/overlapping options)
-- If user has been skipping questions, generate more relevant and specific questions
-- Pay attention to skipped questions - they indicate topics the user finds irrelevant
-- If a question allows multiple choices and conceptually could have "All of the above", include it as the last option
-- If appropriate, include "Other" as the last option to allow user input""",
-                ),
-                (
-                    "human",
-                    """Product Context:
-{product_context}
-
-Customer Context:
-{customer_context}
-
-Previous Q&A:
-{previous_qa}
-
-Already Asked Questions (DO NOT REPEAT):
-{asked_questions}
-{skipped_context}
+        if new_questions is None:
+            new_questions = await self._arequest_followup_questions(state)
+
+        # Don't rely on the prompt guardrail alone - drop repeats in code.
+        # Every asked question comes from all_questions, so its normalized
+        # texts cover both; the set is kept up to date as batches are added.
+        existing_texts = state.get("question_text_keys")
+        if existing_texts is None:
+            existing_texts = {_normalize_question_text(q["question_text"]) for q in state["all_questions"]}
+        new_questions = _drop_repeated_questions(new_questions, existing_texts)
+        if not new_questions:
+            # Whole batch was repeats - ask once more with an explicit warning
+            new_questions = _drop_repeated_questions(
+                await self._arequest_followup_questions(state, avoid_repeats=True),
+                existing_texts,
+            )
+        if not new_questions:
+            # Still only repeats - end this follow-up round like any other: the
+            # next remaining question is presented, or the survey completes
+            print("WARNING: No new follow-up questions generated - all repeated earlier questions")
+            return {"next_action": "ask_question"}
 
-Skipped Questions Count: {skipped_count}
-Consecutive Skips: {consecutive_skips}
+        # Extend in place instead of copying the whole question list every batch
+        updated_questions = state["all_questions"]
+        updated_questions.extend(new_questions)
+        existing_texts.update(_normalize_question_text(q["question_text"]) for q in new_questions)
 
-Generate {num_questions} follow-up questions that build on the conversation.
-CRITICAL: If user has been skipping questions, AVOID topics similar to skipped questions.
-Focus on topics the user HAS engaged with through their answers.
-Make questions more specific, relevant, and actionable based on their actual responses.
+        return {
+            "all_questions": updated_questions,
+            "question_text_keys": existing_texts,
+            "next_action": "ask_question",
+        }
 
-{format_instructions}""",
-                ),
-            ]
+    async def _arequest_followup_questions(
+        self,
+        state: SurveyState,
+        avoid_repeats: bool = False
+    ) -> List[Dict[str, Any]]:
+        """LLM round-trip for the next follow-up batch - reads state, never mutates it"""
+        return await self._ainvoke_followup_prompt(
+            _prompt_cache_options(state), self._followup_prompt_inputs(state, avoid_repeats)
         )
 
-        chain = prompt | self.llm | parser
+    def _followup_prompt_inputs(self, state: SurveyState, avoid_repeats: bool = False) -> Dict[str, Any]:
+        """Render the follow-up prompt variables (strings and ints only, so nothing aliases live state)"""
+        # Answers summary including answered questions only (maintained per answer)
+        answers_summary = state.get("answers_summary")
+        if answers_summary is None:
+            answers_summary = _format_answers_summary(state["answers"])
+
+        # Skipped questions context (maintained per skip)
+        skipped_summary = state.get("skipped_summary")
+        if skipped_summary is None:
+            skipped_summary = _format_skipped_summary(
+                state.get("all_questions", []), state.get("skipped_questions", [])
+            )
+        skipped_context = ""
+        if skipped_summary:
+            skipped_context = "\n\nSkipped Questions (user found these irrelevant):\n" + skipped_summary
 
-        num_followup = min(2, settings.max_survey_questions - state["total_questions_asked"])
+        num_followup = _followup_batch_size(state)
 
+        # Only the most recent asked questions go in the prompt - repeats of older
+        # ones are caught by the dedupe in _agenerate_followup_questions
+        asked_texts = state.get("asked_question_texts", [])
         asked_questions_list = "\n".join(
-            [f"- {q_text}" for q_text in state.get("asked_question_texts", [])]
+            [f"- {q_text}" for q_text in asked_texts[-_PROMPT_RECENT_ASKED_QUESTIONS:]]
         ) or "None yet"
+        earlier_count = len(asked_texts) - _PROMPT_RECENT_ASKED_QUESTIONS
+        if earlier_count > 0:
+            asked_questions_list += f"\n(plus {earlier_count} earlier questions - avoid repeating those too)"
 
-        questionnaire = chain.invoke(
-            {
-                "product_context": json.dumps(state["product_context"], indent=2),
-                "customer_context": json.dumps(state["customer_context"], indent=2),
-                "previous_qa": answers_summary,
-                "asked_questions": asked_questions_list,
-                "skipped_context": skipped_context,
-                "skipped_count": len(state.get("skipped_questions", [])),
-                "consecutive_skips": state.get("consecutive_skips", 0),
-                "num_questions": num_followup,
-                "format_instructions": parser.get_format_instructions(),
-            }
+        return {
+            "product_context": state["product_context_json"],
+            "customer_context": state["customer_context_json"],
+            "previous_qa": answers_summary,
+            "asked_questions": asked_questions_list,
+            "skipped_context": skipped_context,
+            "skipped_count": len(state.get("skipped_questions", [])),
+            "consecutive_skips": state.get("consecutive_skips", 0),
+            "num_questions": num_followup,
+            "repeat_warning": (
+                "\n\nIMPORTANT: Your previous batch only repeated questions that were already asked. "
+                "Every question must cover a topic not yet asked about."
+                if avoid_repeats else ""
+            ),
+        }
+
+    async def _ainvoke_followup_prompt(
+        self,
+        cache_options: Dict[str, Any],
+        prompt_inputs: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Run the follow-up prompt on pre-rendered inputs and keep the usable questions"""
+        chain = _FOLLOWUP_QUESTIONS_PROMPT | structured_output(
+            self.llm, SurveyQuestionnaire, **cache_options
         )
+        questionnaire = await chain.ainvoke(prompt_inputs)
 
         new_questions = []
         for q in questionnaire.questions:
-            q_dict = q.dict()
-            if not q_dict.get("options") or len(q_dict["options"]) < 2:
-                print(f"WARNING: Followup question has insufficient options, skipping: {q_dict.get('question_text')}")
+            if len(q.options) < 2:
+                print(f"WARNING: Followup question has insufficient options, skipping: {q.question_text}")
                 continue
-            new_questions.append(q_dict)
+            new_questions.append(q.model_dump())
 
-        updated_questions = list(state["all_questions"]) + new_questions
+        return new_questions
 
-        return {
-            "all_questions": updated_questions,
-            "next_action": "ask_question",
+    def _prefetch_followup_questions(self, session_id: str, state: Dict[str, Any]) -> None:
+        """
+        Start the next follow-up batch in the background when the next answer
+        will land on a follow-up boundary, so that answer doesn't wait on the LLM.
+
+        The batch is generated without the pending answer. It is only reused if
+        the session reaches the boundary exactly as predicted (one more answer,
+        no skips or edits in between); otherwise it is discarded.
+        """
+        boundary_state = {
+            **state,
+            "current_question_index": state["current_question_index"] + 1,
+            "answered_questions_count": state.get("answered_questions_count", 0) + 1,
         }
+        if self._route_after_answer(boundary_state) != "generate_followup":
+            return
+        if _followup_batch_size(state) <= 0:
+            return
+
+        # Render the prompt now - the live state keeps mutating after this returns
+        request = self._ainvoke_followup_prompt(
+            _prompt_cache_options(state), self._followup_prompt_inputs(state)
+        )
+        boundary_key = (
+            boundary_state["current_question_index"],
+            boundary_state["answered_questions_count"],
+        )
+        self._cancel_followup_prefetch(session_id)
+        task = asyncio.get_running_loop().create_task(request)
+        self._followup_prefetch[session_id] = (boundary_key, task)
 
-    def _route_after_question(self, state: SurveyState) -> str:
-        if state["next_action"] == "complete_survey":
-            return "complete_survey"
-        return "wait_for_answer"
+    async def _take_prefetched_followups(
+        self,
+        session_id: str,
+        state: Dict[str, Any]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Return the prefetched follow-up batch if it matches this state, else None"""
+        entry = self._followup_prefetch.pop(session_id, None)
+        if entry is None:
+            return None
+
+        boundary_key, task = entry
+        if boundary_key != (state["current_question_index"], state.get("answered_questions_count", 0)):
+            task.cancel()
+            return None
+
+        try:
+            return await asyncio.wait_for(task, timeout=_FOLLOWUP_PREFETCH_TIMEOUT_SECONDS)
+        except Exception as e:
+            print(f"Prefetched follow-up questions unavailable, regenerating: {e}")
+            return None
 
     def _route_after_answer(self, state: SurveyState) -> str:
         """
         Route logic based on answered questions count (excluding skips).
-        Survey completes when 10-15 answered questions are reached.
+        Survey completes once min_answered_questions answered questions are reached
+        (max_answered_questions caps it if configured lower).
         """
-        total_asked = state["total_questions_asked"]
         answered_count = state.get("answered_questions_count", 0)
-        total_available = len(state["all_questions"])
-
-        # Complete if we've reached max answered questions (10-15 range)
-        if answered_count >= settings.max_answered_questions:
-            return "complete_survey"
 
-        # Generate follow-ups if we've reached min answered questions and need more questions
-        if answered_count >= settings.min_answered_questions:
-            # Survey is now comprehensive - complete it
+        # Survey is comprehensive - complete it
+        if answered_count >= self._complete_at_answered:
             return "complete_survey"
 
-        # Safety check - don't exceed total question limit
-        if total_asked >= settings.max_survey_questions:
-            if answered_count >= settings.min_answered_questions:
-                return "complete_survey"
-            else:
-                # Need more answered questions - generate follow-ups
-                return "generate_followup"
+        # Total question limit reached but still short of min answered - need follow-ups
+        if state["total_questions_asked"] >= self._max_total_questions:
+            return "generate_followup"
 
         # Generate follow-ups every few questions or when running out of questions
-        if answered_count > 0 and answered_count % 3 == 0:
+        if answered_count and answered_count % 3 == 0:
             return "generate_followup"
 
-        if state["current_question_index"] < total_available:
+        if state["current_question_index"] < len(state["all_questions"]):
             return "ask_next"
-        else:
-            return "generate_followup"
+        return "generate_followup"
 
-    def _complete_survey(self, session_id: str, final_state: Dict[str, Any]) -> None:
+    async def _complete_survey(
+        self,
+        session_id: str,
+        final_state: Dict[str, Any],
+        completed_at: Optional[str] = None
+    ) -> None:
         """
         Complete survey session with final Q&A and complete state
 
@@ -445,6 +1038,7 @@ Make questions more specific, relevant, and actionable based on their actual res
         Args:
             session_id: Session UUID
             final_state: Final survey state with all answers
+            completed_at: ISO timestamp of the finishing answer/skip (defaults to now)
         """
         # Build questions_and_answers JSONB from state
         questions_and_answers = []
@@ -456,16 +1050,13 @@ Make questions more specific, relevant, and actionable based on their actual res
                 "timestamp": ans["timestamp"]
             })
 
-        # Update survey_sessions with final Q&A
-        db.complete_survey_session(
+        # Update survey_sessions with final Q&A and complete survey state
+        # (single UPDATE - both columns live on the same row)
+        await asyncio.to_thread(
+            db.complete_survey_session,
             session_id=session_id,
-            questions_and_answers=questions_and_answers
-        )
-
-        # Store complete survey state in session_context
-        db.update_session_context(
-            session_id=session_id,
-            session_context=final_state  # Complete survey agent state
+            questions_and_answers=questions_and_answers,
+            session_context=_persistable_state(final_state)  # Complete survey agent state
         )
 
         # LOG EVENT: survey_completed (ASYNC)
@@ -476,11 +1067,11 @@ Make questions more specific, relevant, and actionable based on their actual res
                 "total_questions": len(final_state.get("all_questions", [])),
                 "answered_count": final_state.get("answered_questions_count", 0),
                 "skipped_count": len(final_state.get("skipped_questions", [])),
-                "completion_time": datetime.utcnow().isoformat()
+                "completion_time": completed_at or _utc_now_iso()
             }
         )
 
-    def start_survey(self, user_id: str, item_id: str, form_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def start_survey(self, user_id: str, item_id: str, form_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Start new survey session (SMP → SVP transition)
 
@@ -495,12 +1086,18 @@ Make questions more specific, relevant, and actionable based on their actual res
         Returns:
             dict: First question and session metadata
         """
-        # STEP 1: Fetch agent contexts FIRST (frozen after start)
-        product_context = product_context_agent.generate_context(item_id=item_id)
-        customer_context = customer_context_agent.generate_context(user_id=user_id, item_id=item_id)
+        # STEP 1 + 2: Fetch agent contexts (frozen after start) and the transaction
+        # All three are independent blocking round-trips (two LLM, one DB) - run
+        # them concurrently so start-up costs the slowest one, not the sum
+        product_context, customer_context, existing_txn = await asyncio.gather(
+            asyncio.to_thread(product_context_agent.generate_context, item_id=item_id),
+            asyncio.to_thread(
+                customer_context_agent.generate_context, user_id=user_id, item_id=item_id
+            ),
+            asyncio.to_thread(db.get_user_transaction_for_product, user_id, item_id),
+        )
 
-        # STEP 2: Get transaction (MUST exist from data engineering step)
-        existing_txn = db.get_user_transaction_for_product(user_id, item_id)
+        # Transaction MUST exist from data engineering step
         if not existing_txn:
             raise ValueError(
                 f"Transaction not found for user {user_id} and product {item_id}. "
@@ -510,22 +1107,36 @@ Make questions more specific, relevant, and actionable based on their actual res
 
         transaction_id = existing_txn["transaction_id"]
 
+        # Contexts are frozen for the session - dump each model once and share
+        # the dict between the session row and the in-memory state
+        product_context_dict = product_context.model_dump()
+        customer_context_dict = customer_context.model_dump()
+
         # STEP 3: Create session with contexts (NEW SCHEMA)
-        session_id = db.create_survey_session(
+        # Question generation doesn't need the session_id, so the INSERT runs
+        # concurrently with the LLM generating the initial questions
+        session_task = asyncio.to_thread(
+            db.create_survey_session,
             user_id=user_id,
             item_id=item_id,
             transaction_id=transaction_id,
-            product_context=product_context.dict(),  # JSONB - frozen
-            customer_context=customer_context.dict()   # JSONB - frozen
+            product_context=product_context_dict,  # JSONB - frozen
+            customer_context=customer_context_dict   # JSONB - frozen
         )
 
-        # STEP 4: Generate initial questions (existing LangGraph logic)
+        # STEP 4: Generate initial questions
+        # Serialize the contexts for prompts once here as well
+        # (sorted keys keep the prompt prefix byte-identical across calls)
+        product_context_json = json_dumps(product_context_dict, indent=True, sort_keys=True)
+        customer_context_json = json_dumps(customer_context_dict, indent=True, sort_keys=True)
         initial_state: SurveyState = {
-            "session_id": session_id,
+            "session_id": None,  # Filled in once the session INSERT completes
             "user_id": user_id,
             "item_id": item_id,
-            "product_context": product_context.dict(),
-            "customer_context": customer_context.dict(),
+            "product_context": product_context_dict,
+            "customer_context": customer_context_dict,
+            "product_context_json": product_context_json,
+            "customer_context_json": customer_context_json,
             "all_questions": [],
             "current_question_index": 0,
             "answers": [],
@@ -534,14 +1145,45 @@ Make questions more specific, relevant, and actionable based on their actual res
             "skipped_questions": [],
             "consecutive_skips": 0,
             "asked_question_texts": [],
-            "conversation_history": [],
-            "next_action": "generate_initial_questions",  # Skip fetch_contexts (already done)
+            "asked_question_texts_set": set(),
+            "answers_summary": "",
+            "skipped_summary": "",
+            "conversation_history": [
+                {
+                    "role": "system",
+                    "content": f"Product Context: {product_context_json}\n\n"
+                    f"Customer Context: {customer_context_json}",
+                }
+            ],
+            "next_action": "generate_initial_questions",
         }
 
-        result = self.graph.invoke(initial_state)
+        # return_exceptions: always wait for both - neither may outlive this request
+        # (only the tail of the question stream does, appending to this state)
+        stop_questions = Event()
+        session_id, pending_questions = await asyncio.gather(
+            session_task,
+            self._generate_initial_questions(initial_state, stop_questions),
+            return_exceptions=True,
+        )
+        if isinstance(session_id, BaseException):
+            # No session to serve - stop the stream and discard what it produced
+            stop_questions.set()
+            initial_state["all_questions"].clear()
+        for outcome in (session_id, pending_questions):
+            if isinstance(outcome, BaseException):
+                raise outcome
+        initial_state["session_id"] = session_id
+        initial_state.update(self._present_question(initial_state))
+        result = initial_state
 
         # STEP 5: Store state in-memory cache (lazy DB update - only at start and end)
-        self._session_state_cache[session_id] = result
+        if self._shared_store is not None and not pending_questions.done():
+            # Another worker may serve the next answer - store the whole batch
+            await asyncio.wrap_future(pending_questions)
+        await self._aput_session_state(session_id, result)
+        if not pending_questions.done():
+            self._initial_questions_pending[session_id] = pending_questions
 
         # STEP 6: Log first question_generated event (ASYNC - fast update)
         current_q = result["all_questions"][result["current_question_index"]]
@@ -561,19 +1203,27 @@ Make questions more specific, relevant, and actionable based on their actual res
             "session_id": session_id,
             "question": current_q,
             "question_number": result["current_question_index"] + 1,
-            "total_questions": len(result["all_questions"]),
+            # While the batch is still streaming, report the requested batch size
+            "total_questions": max(len(result["all_questions"]), settings.initial_questions_count)
+            if session_id in self._initial_questions_pending
+            else len(result["all_questions"]),
             "answered_questions_count": result.get("answered_questions_count", 0),
         }
 
-    def submit_answer(self, session_id: str, answer: str) -> Dict[str, Any]:
+    async def submit_answer(self, session_id: str, answer: str) -> Dict[str, Any]:
         """
         Submit answer, get next question
 
         Uses in-memory state cache (lazy DB update - only at completion).
         Logs answer_submitted event to survey_details (async fast update).
         """
+        async with self._session_turn(session_id):
+            return await self._submit_answer(session_id, answer)
+
+    async def _submit_answer(self, session_id: str, answer: str) -> Dict[str, Any]:
+        """submit_answer body, run under the session lock"""
         # Get state from in-memory cache
-        current_state = self._session_state_cache.get(session_id)
+        current_state = await self._aload_session_state(session_id)
         if not current_state:
             raise ValueError(f"Session state not found: {session_id}")
 
@@ -587,9 +1237,14 @@ Make questions more specific, relevant, and actionable based on their actual res
                 f"Please wait for the previous answer to be processed."
             )
 
-        # Process answer
-        state_update = self._process_answer(current_state, answer)
+        # Process answer (appends to the cached lists - checkpoint for rollback)
+        checkpoint = _list_lengths(current_state)
+        # One timestamp for the answer record and its event
+        submitted_at = _utc_now_iso()
+        state_update = self._process_answer(current_state, answer, timestamp=submitted_at)
+        # Scalars go on a private copy so a failed turn leaves the cached state as it was
         updated_state = {**current_state, **state_update}
+        answered_count = state_update["answered_questions_count"]
 
         # LOG EVENT: answer_submitted (ASYNC - fast update to survey_details)
         current_q = all_questions[current_index]
@@ -600,48 +1255,67 @@ Make questions more specific, relevant, and actionable based on their actual res
                 "question_number": current_index + 1,
                 "question_text": current_q["question_text"],
                 "selected_option": answer,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": submitted_at
             }
         )
 
         next_route = self._route_after_answer(updated_state)
 
+        if next_route == "generate_followup":
+            # Generate follow-up questions (reusing the speculative batch if ready)
+            try:
+                followup_update = await self._agenerate_followup_questions(
+                    updated_state, await self._take_prefetched_followups(session_id, updated_state)
+                )
+            except Exception:
+                _truncate_lists(current_state, checkpoint)
+                raise
+            updated_state.update(followup_update)
+
+            present_update = self._present_question(updated_state)
+            updated_state.update(present_update)
+
+            if updated_state["next_action"] == "complete_survey":
+                # Question budget spent and nothing left to ask - finish the survey
+                next_route = "complete_survey"
+            else:
+                # LOG EVENT: question_generated (ASYNC - fast update to survey_details)
+                next_q = updated_state["all_questions"][updated_state["current_question_index"]]
+                self._log_event_async(
+                    session_id=session_id,
+                    event_type="question_generated",
+                    event_detail={
+                        "question_number": updated_state["current_question_index"] + 1,
+                        "question_text": next_q["question_text"],
+                        "options": next_q["options"],
+                        "allow_multiple": next_q.get("allow_multiple", False),
+                        "reasoning": next_q.get("reasoning", "")
+                    }
+                )
+        elif next_route == "ask_next":
+            # Next answer may hit a follow-up boundary - overlap that LLM call
+            # with the user reading and answering this question
+            self._prefetch_followup_questions(session_id, updated_state)
+
         if next_route == "complete_survey":
             # COMPLETE SURVEY - Lazy update to survey_sessions
-            self._complete_survey(session_id, updated_state)
+            try:
+                await self._complete_survey(session_id, updated_state, completed_at=submitted_at)
+            except Exception:
+                _truncate_lists(current_state, checkpoint)
+                raise
 
             # Clear from cache
-            del self._session_state_cache[session_id]
+            await self._adrop_session_state(session_id)
 
             return {
                 "session_id": session_id,
                 "status": "survey_completed",
-                "answered_questions_count": updated_state.get("answered_questions_count", 0),
+                "answered_questions_count": answered_count,
             }
-        elif next_route == "generate_followup":
-            # Generate follow-up questions
-            followup_update = self._generate_followup_questions(updated_state)
-            updated_state = {**updated_state, **followup_update}
-
-            present_update = self._present_question(updated_state)
-            updated_state = {**updated_state, **present_update}
-
-            # LOG EVENT: question_generated (ASYNC - fast update to survey_details)
-            next_q = updated_state["all_questions"][updated_state["current_question_index"]]
-            self._log_event_async(
-                session_id=session_id,
-                event_type="question_generated",
-                event_detail={
-                    "question_number": updated_state["current_question_index"] + 1,
-                    "question_text": next_q["question_text"],
-                    "options": next_q["options"],
-                    "allow_multiple": next_q.get("allow_multiple", False),
-                    "reasoning": next_q.get("reasoning", "")
-                }
-            )
 
         # Update in-memory cache (NO DB write - lazy update only at completion)
-        self._session_state_cache[session_id] = updated_state
+        await self._aput_session_state(session_id, updated_state)
 
         next_index = updated_state["current_question_index"]
         all_questions = updated_state["all_questions"]
@@ -659,13 +1333,18 @@ Make questions more specific, relevant, and actionable based on their actual res
             "question": current_q,
             "question_number": next_index + 1,
             "total_questions": len(all_questions),
-            "answered_questions_count": updated_state.get("answered_questions_count", 0),
+            "answered_questions_count": answered_count,
         }
 
-    def skip_question(self, session_id: str) -> Dict[str, Any]:
+    async def skip_question(self, session_id: str) -> Dict[str, Any]:
         """Skip question with limits - uses in-memory cache"""
+        async with self._session_turn(session_id):
+            return await self._skip_question(session_id)
+
+    async def _skip_question(self, session_id: str) -> Dict[str, Any]:
+        """skip_question body, run under the session lock"""
         # Get state from in-memory cache
-        current_state = self._session_state_cache.get(session_id)
+        current_state = await self._aload_session_state(session_id)
         if not current_state:
             raise ValueError(f"Session state not found in cache: {session_id}")
 
@@ -679,8 +1358,6 @@ Make questions more specific, relevant, and actionable based on their actual res
                 f"This helps us generate better, more relevant questions for you."
             )
 
-        total_skipped = len(current_state.get("skipped_questions", []))
-        total_answered = len(current_state.get("answers", []))
         answered_count = current_state.get("answered_questions_count", 0)
         all_questions = current_state.get("all_questions", [])
         current_index = current_state.get("current_question_index", 0)
@@ -694,20 +1371,25 @@ Make questions more specific, relevant, and actionable based on their actual res
             )
 
         # Get current question before processing skip
-        current_q = current_state["all_questions"][current_state["current_question_index"]]
+        current_q = all_questions[current_index]
 
+        checkpoint = _list_lengths(current_state)
         state_update = self._process_answer(current_state, answer=None, is_skipped=True)
+        # Scalars go on a private copy so a failed turn leaves the cached state as it was
         updated_state = {**current_state, **state_update}
+        skipped_count = len(updated_state["skipped_questions"])
+        # One timestamp for the skip event and a completion it triggers
+        skipped_at = _utc_now_iso()
 
         # LOG EVENT: answer_skipped (ASYNC)
         self._log_event_async(
             session_id=session_id,
             event_type="answer_skipped",
             event_detail={
-                "question_number": current_state["current_question_index"] + 1,
+                "question_number": current_index + 1,
                 "question_text": current_q["question_text"],
-                "skip_count": len(updated_state.get("skipped_questions", [])),
-                "timestamp": datetime.utcnow().isoformat()
+                "skip_count": skipped_count,
+                "timestamp": skipped_at
             }
         )
 
@@ -715,65 +1397,80 @@ Make questions more specific, relevant, and actionable based on their actual res
 
         if next_route == "complete_survey":
             # Ensure we have minimum answered questions before completing
-            if updated_state.get("answered_questions_count", 0) < settings.min_answered_questions:
+            # (a skip never changes the answered count)
+            if answered_count < settings.min_answered_questions:
                 next_route = "generate_followup"
 
+        if next_route == "generate_followup":
+            try:
+                followup_update = await self._agenerate_followup_questions(
+                    updated_state, await self._take_prefetched_followups(session_id, updated_state)
+                )
+            except Exception:
+                _truncate_lists(current_state, checkpoint)
+                raise
+            updated_state.update(followup_update)
+
+            present_update = self._present_question(updated_state)
+            updated_state.update(present_update)
+
+            if updated_state["next_action"] == "complete_survey":
+                # Question budget spent and nothing left to ask - finish the survey
+                next_route = "complete_survey"
+            else:
+                # LOG EVENT: question_generated (ASYNC)
+                next_q = updated_state["all_questions"][updated_state["current_question_index"]]
+                self._log_event_async(
+                    session_id=session_id,
+                    event_type="question_generated",
+                    event_detail={
+                        "question_number": updated_state["current_question_index"] + 1,
+                        "question_text": next_q["question_text"],
+                        "options": next_q["options"],
+                        "allow_multiple": next_q.get("allow_multiple", False),
+                        "reasoning": next_q.get("reasoning", "")
+                    }
+                )
+
         if next_route == "complete_survey":
             # COMPLETE SURVEY - Lazy update
-            self._complete_survey(session_id, updated_state)
-            del self._session_state_cache[session_id]
+            try:
+                await self._complete_survey(session_id, updated_state, completed_at=skipped_at)
+            except Exception:
+                _truncate_lists(current_state, checkpoint)
+                raise
+            await self._adrop_session_state(session_id)
 
             return {
                 "session_id": session_id,
                 "status": "survey_completed",
-                "answered_questions_count": updated_state.get("answered_questions_count", 0),
+                "answered_questions_count": answered_count,
             }
-        elif next_route == "generate_followup":
-            followup_update = self._generate_followup_questions(updated_state)
-            updated_state = {**updated_state, **followup_update}
-
-            present_update = self._present_question(updated_state)
-            updated_state = {**updated_state, **present_update}
-
-            # LOG EVENT: question_generated (ASYNC)
-            next_q = updated_state["all_questions"][updated_state["current_question_index"]]
-            self._log_event_async(
-                session_id=session_id,
-                event_type="question_generated",
-                event_detail={
-                    "question_number": updated_state["current_question_index"] + 1,
-                    "question_text": next_q["question_text"],
-                    "options": next_q["options"],
-                    "allow_multiple": next_q.get("allow_multiple", False),
-                    "reasoning": next_q.get("reasoning", "")
-                }
-            )
 
         # Update in-memory cache (NO DB write during survey)
-        self._session_state_cache[session_id] = updated_state
+        await self._aput_session_state(session_id, updated_state)
 
+        # all_questions is the live list (follow-ups are appended in place)
         next_index = updated_state["current_question_index"]
-        all_questions = updated_state["all_questions"]
+        total_questions = len(all_questions)
 
-        if next_index >= len(all_questions):
+        if next_index >= total_questions:
             raise ValueError(f"Question index out of bounds after skip")
 
-        current_q = all_questions[next_index]
-
         return {
             "session_id": session_id,
-            "question": current_q,
+            "question": all_questions[next_index],
             "question_number": next_index + 1,
-            "total_questions": len(all_questions),
-            "answered_questions_count": updated_state.get("answered_questions_count", 0),
-            "skipped_count": len(updated_state.get("skipped_questions", [])),
-            "consecutive_skips": updated_state.get("consecutive_skips", 0),
+            "total_questions": total_questions,
+            "answered_questions_count": answered_count,
+            "skipped_count": skipped_count,
+            "consecutive_skips": state_update["consecutive_skips"],
         }
 
-    def get_question_for_edit(self, session_id: str, question_number: int) -> Dict[str, Any]:
+    async def get_question_for_edit(self, session_id: str, question_number: int) -> Dict[str, Any]:
         """Get the original question for editing - uses in-memory cache"""
         # Get state from in-memory cache
-        current_state = self._session_state_cache.get(session_id)
+        current_state = await self._aload_session_state(session_id)
         if not current_state:
             raise ValueError(f"Session state not found in cache: {session_id}")
 
@@ -792,10 +1489,15 @@ Make questions more specific, relevant, and actionable based on their actual res
             "is_edit_mode": True,
         }
 
-    def edit_answer(self, session_id: str, question_number: int, new_answer: str) -> Dict[str, Any]:
+    async def edit_answer(self, session_id: str, question_number: int, new_answer: str) -> Dict[str, Any]:
         """Edit previous answer, branch from that point - uses in-memory cache"""
+        async with self._session_turn(session_id):
+            return await self._edit_answer(session_id, question_number, new_answer)
+
+    async def _edit_answer(self, session_id: str, question_number: int, new_answer: str) -> Dict[str, Any]:
+        """edit_answer body, run under the session lock"""
         # Get state from in-memory cache
-        current_state = self._session_state_cache.get(session_id)
+        current_state = await self._aload_session_state(session_id)
         if not current_state:
             raise ValueError(f"Session state not found in cache: {session_id}")
 
@@ -807,22 +1509,32 @@ Make questions more specific, relevant, and actionable based on their actual res
             raise ValueError(f"Invalid question number: {question_number}")
 
         # Get old answer for event logging
-        old_answer = None
-        for ans in current_state["answers"]:
-            if ans["question_index"] == question_index:
-                old_answer = ans["answer"]
-                break
-
-        branched_answers = current_state["answers"][:question_index]
-
-        current_q = current_state["all_questions"][question_index]
+        old_answer = _answer_index(current_state).get(question_index)
+
+        # Branch in place - the cached state owns these lists, so the discarded
+        # tail is truncated instead of copying the kept prefix into new lists
+        answers = current_state["answers"]
+        conversation_history = current_state.setdefault("conversation_history", [])
+        # History is the system context message, then one question/answer pair per
+        # answer unless skips were interleaved
+        context_len = 1 if conversation_history and conversation_history[0].get("role") == "system" else 0
+        history_aligned = len(conversation_history) == context_len + 2 * len(answers)
+        # Answers are kept in question order and skipped questions have no record,
+        # so cut at the first answer for the edited question or a later one
+        cut = len(answers)
+        while cut and answers[cut - 1]["question_index"] >= question_index:
+            cut -= 1
+        removed_answers = answers[cut:]
+        del answers[cut:]
+
+        current_q = all_questions[question_index]
         new_answer_record = {
             "question_index": question_index,
             "question": current_q["question_text"],
             "answer": new_answer,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _utc_now_iso(),
         }
-        branched_answers.append(new_answer_record)
+        answers.append(new_answer_record)
 
         # LOG EVENT: answer_updated (ASYNC)
         self._log_event_async(
@@ -833,59 +1545,88 @@ Make questions more specific, relevant, and actionable based on their actual res
                 "question_text": current_q["question_text"],
                 "old_option": old_answer,
                 "new_option": new_answer,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": new_answer_record["timestamp"]
             }
         )
 
-        branched_conversation = []
-        for ans in branched_answers:
-            branched_conversation.extend([
-                {"role": "assistant", "content": ans["question"]},
-                {"role": "user", "content": ans["answer"]},
-            ])
+        if history_aligned:
+            del conversation_history[context_len + 2 * (len(answers) - 1):]
+            conversation_history.extend((
+                {"role": "assistant", "content": new_answer_record["question"]},
+                {"role": "user", "content": new_answer},
+            ))
+        else:
+            conversation_history[context_len:] = chain.from_iterable(
+                (
+                    {"role": "assistant", "content": ans["question"]},
+                    {"role": "user", "content": ans["answer"]},
+                )
+                for ans in answers
+            )
 
         # Recalculate answered_questions_count (excluding skipped questions)
-        skipped_set = set(current_state.get("skipped_questions", []))
-        # Update skipped set - remove skips from branched portion
-        skipped_set = {idx for idx in skipped_set if idx < question_index}
-        # Count only answered (non-skipped) questions in branched_answers
-        answered_count = sum(1 for ans in branched_answers if ans["question_index"] not in skipped_set)
-
-        branched_state = {
-            **current_state,
-            "answers": branched_answers,
-            "conversation_history": branched_conversation,
+        # Keep only skips from the branched portion
+        skipped_questions = current_state.setdefault("skipped_questions", [])
+        kept_skips = [idx for idx in skipped_questions if idx < question_index]
+        if len(kept_skips) != len(skipped_questions):
+            skipped_questions[:] = kept_skips
+            current_state["skipped_summary"] = _format_skipped_summary(all_questions, skipped_questions)
+        # Skips never get an answer record, so every branched answer counts
+        answered_count = len(answers)
+
+        # Patch the running summary and index for the cut tail (usually just the
+        # edited last answer) instead of rebuilding them from every answer
+        answers_summary = current_state.get("answers_summary")
+        if answers_summary is not None:
+            answers_summary = _drop_trailing_answer_entries(answers_summary, removed_answers, cut + 1)
+        if answers_summary is None:
+            answers_summary = _format_answers_summary(answers)
+        else:
+            answers_summary = _append_line(
+                answers_summary, _format_answer_entry(len(answers), new_answer_record)
+            )
+        answer_index = _answer_index(current_state)
+        for ans in removed_answers:
+            answer_index.pop(ans["question_index"], None)
+        answer_index[question_index] = new_answer
+
+        current_state.update({
+            "answers_summary": answers_summary,
             "current_question_index": question_index + 1,
-            "total_questions_asked": len(branched_answers),
+            "total_questions_asked": len(answers),
             "answered_questions_count": answered_count,
-            "skipped_questions": list(skipped_set),
             "consecutive_skips": 0,  # Reset consecutive skips after edit
             "generated_reviews": None,
-        }
+        })
 
         # Update in-memory cache (NO DB write during survey)
-        self._session_state_cache[session_id] = branched_state
+        await self._aput_session_state(session_id, current_state)
+        # Any speculative follow-up batch was built from the discarded branch
+        self._cancel_followup_prefetch(session_id)
 
-        if branched_state["current_question_index"] >= len(branched_state["all_questions"]):
+        next_index = question_index + 1
+        if next_index >= len(all_questions):
             return {
                 "session_id": session_id,
                 "status": "completed",
-                "answered_questions_count": branched_state.get("answered_questions_count", 0),
+                "answered_questions_count": answered_count,
                 "message": "Reached end of survey after editing"
             }
 
-        current_q = branched_state["all_questions"][branched_state["current_question_index"]]
-
         return {
             "session_id": session_id,
             "status": "continue",
-            "question": current_q,
-            "question_number": branched_state["current_question_index"] + 1,
-            "total_questions": len(branched_state["all_questions"]),
-            "answered_questions_count": branched_state.get("answered_questions_count", 0),
+            "question": all_questions[next_index],
+            "question_number": next_index + 1,
+            "total_questions": len(all_questions),
+            "answered_questions_count": answered_count,
         }
 
-    def get_survey_state(self, session_id: str) -> Dict[str, Any]:
+    def get_survey_state(
+        self,
+        session_id: str,
+        session: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Get current survey state from in-memory cache or database
 
@@ -895,6 +1636,8 @@ Make questions more specific, relevant, and actionable based on their actual res
 
         Args:
             session_id: Session UUID
+            session: survey_sessions row the caller already fetched - reused
+                instead of querying the database again
 
         Returns:
             Complete survey state dict with answers, questions, etc.
@@ -903,13 +1646,13 @@ Make questions more specific, relevant, and actionable based on their actual res
             ValueError: If session not found in cache or database
         """
         # Try in-memory cache first (survey in progress)
-        current_state = self._session_state_cache.get(session_id)
+        current_state = self._get_session_state(session_id)
         if current_state:
-            return current_state
+            return _persistable_state(current_state)
 
         # Survey completed - retrieve from database session_context
-        from database.supabase_client import db
-        session = db.get_survey_session(session_id)
+        if session is None:
+            session = db.get_survey_session(session_id)
         if not session:
             raise ValueError(f"Session not found: {session_id}")
 
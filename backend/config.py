@@ -47,6 +47,9 @@ class Settings(BaseSettings):
     # RapidAPI Configuration
     rapidapi_key: Optional[str] = None
 
+    # Shared survey session store (optional - enables multiple backend workers)
+    redis_url: Optional[str] = None
+
     class Config:
         env_file = ".env.local"
         case_sensitive = False
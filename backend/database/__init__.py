@@ -1,5 +1,6 @@
 """Database utilities package"""
 
-from .supabase_client import db, SupabaseDB
+from .supabase_client import db, get_db, SupabaseDB
+from .session_store import RedisSessionStore
 
-__all__ = ["db", "SupabaseDB"]
+__all__ = ["db", "get_db", "SupabaseDB", "RedisSessionStore"]
@@ -15,6 +15,10 @@ DROP TABLE IF EXISTS products CASCADE;
 
 -- Drop functions
 DROP FUNCTION IF EXISTS match_products(vector, int, int) CASCADE;
+DROP FUNCTION IF EXISTS match_products_with_reviews(vector, float, int, int) CASCADE;
+DROP FUNCTION IF EXISTS match_user_purchases(vector, uuid, float, int, int) CASCADE;
+DROP FUNCTION IF EXISTS cleanup_all_mock_data() CASCADE;
+DROP FUNCTION IF EXISTS save_review_with_session_context(uuid, varchar, uuid, text, int, varchar, vector, uuid, jsonb) CASCADE;
 DROP FUNCTION IF EXISTS update_updated_at_column() CASCADE;
 
 -- Note: Extensions are kept enabled (uuid-ossp, vector)
@@ -197,6 +201,9 @@ CREATE INDEX IF NOT EXISTS idx_transactions_user_id ON transactions(user_id);
 CREATE INDEX IF NOT EXISTS idx_transactions_order_date ON transactions(order_date);
 CREATE INDEX IF NOT EXISTS idx_transactions_status ON transactions(transaction_status);
 CREATE INDEX IF NOT EXISTS idx_transactions_is_mock ON transactions(is_mock);
+-- A user's purchases newest first (purchase history, match_user_purchases) and of one product
+CREATE INDEX IF NOT EXISTS idx_transactions_user_order_date ON transactions(user_id, order_date DESC);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_item_order_date ON transactions(user_id, item_id, order_date DESC);
 
 -- Comments
 COMMENT ON TABLE transactions IS 'Purchase and delivery tracking';
@@ -246,6 +253,9 @@ CREATE INDEX IF NOT EXISTS idx_reviews_stars ON reviews(review_stars);
 CREATE INDEX IF NOT EXISTS idx_reviews_embeddings ON reviews USING ivfflat(embeddings vector_cosine_ops) WITH (lists = 100);
 CREATE INDEX IF NOT EXISTS idx_reviews_source ON reviews(source);
 CREATE INDEX IF NOT EXISTS idx_reviews_manual_or_agent ON reviews(manual_or_agent_generated);
+-- Latest reviews of a product / by a user
+CREATE INDEX IF NOT EXISTS idx_reviews_item_created_at ON reviews(item_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_reviews_user_created_at ON reviews(user_id, created_at DESC);
 
 -- Comments
 COMMENT ON TABLE reviews IS 'User-generated reviews with AI-generated embeddings and sentiment';
@@ -329,6 +339,8 @@ CREATE TABLE survey_details (
 CREATE INDEX idx_survey_details_session_id ON survey_details(session_id);
 CREATE INDEX idx_survey_details_event_type ON survey_details(event_type);
 CREATE INDEX idx_survey_details_created_at ON survey_details(created_at);
+-- One session's events of a type in order (get_session_questions)
+CREATE INDEX idx_survey_details_session_event_created_at ON survey_details(session_id, event_type, created_at);
 
 -- Comments
 COMMENT ON TABLE survey_details IS 'Event log of all survey interactions for analytics and reconstruction';
@@ -457,6 +469,36 @@ USING (
 );
 
 
+-- Function to wipe all application data in a single call
+-- Used by the mock data generator to start each run from a clean database
+
+CREATE OR REPLACE FUNCTION cleanup_all_mock_data()
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  deleted_counts jsonb;
+BEGIN
+  -- Row counts are taken before truncating so callers can report what was removed
+  SELECT jsonb_build_object(
+    'survey_sessions', (SELECT count(*) FROM survey_sessions),
+    'reviews', (SELECT count(*) FROM reviews),
+    'transactions', (SELECT count(*) FROM transactions),
+    'users', (SELECT count(*) FROM users),
+    'products', (SELECT count(*) FROM products)
+  ) INTO deleted_counts;
+
+  -- CASCADE also empties survey_details (references survey_sessions)
+  TRUNCATE survey_sessions, reviews, transactions, users, products CASCADE;
+
+  RETURN deleted_counts;
+END;
+$$;
+
+-- Add comment
+COMMENT ON FUNCTION cleanup_all_mock_data IS 'Truncate all application tables and return the row counts removed per table';
+
+
 -- Function for vector similarity search on products
 -- Used by Agent 1 to find similar products
 
@@ -499,3 +541,201 @@ $$;
 
 -- Add comment
 COMMENT ON FUNCTION match_products IS 'Find similar products using cosine similarity on embeddings';
+
+
+-- Function for vector similarity search on products, with their latest reviews
+-- Used by Agent 1 to fetch similar products and their reviews in one call
+
+CREATE OR REPLACE FUNCTION match_products_with_reviews(
+  query_embedding vector(1536),
+  match_threshold float DEFAULT 0.7,
+  match_count int DEFAULT 5,
+  review_limit int DEFAULT 10
+)
+RETURNS TABLE (
+  item_id varchar,
+  product_url text,
+  title text,
+  brand varchar,
+  category varchar,
+  price numeric,
+  description text,
+  review_count int,
+  similarity float,
+  reviews jsonb
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  RETURN QUERY
+  WITH matched AS (
+    SELECT
+      p.item_id,
+      p.product_url,
+      p.title,
+      p.brand,
+      p.category,
+      p.price,
+      p.description,
+      p.review_count,
+      1 - (p.embeddings <=> query_embedding) AS similarity
+    FROM products p
+    WHERE 1 - (p.embeddings <=> query_embedding) > match_threshold
+    ORDER BY p.embeddings <=> query_embedding
+    LIMIT match_count
+  )
+  SELECT
+    m.item_id,
+    m.product_url,
+    m.title,
+    m.brand,
+    m.category,
+    m.price,
+    m.description,
+    m.review_count,
+    m.similarity,
+    COALESCE(latest.reviews, '[]'::jsonb) AS reviews
+  FROM matched m
+  LEFT JOIN LATERAL (
+    -- Latest reviews per product (without their embeddings), newest first
+    SELECT jsonb_agg(to_jsonb(r) - 'embeddings' ORDER BY r.created_at DESC) AS reviews
+    FROM (
+      SELECT rv.*
+      FROM reviews rv
+      WHERE rv.item_id = m.item_id
+      ORDER BY rv.created_at DESC
+      LIMIT review_limit
+    ) r
+  ) latest ON true
+  ORDER BY m.similarity DESC;
+END;
+$$;
+
+-- Add comment
+COMMENT ON FUNCTION match_products_with_reviews IS 'Find similar products using cosine similarity on embeddings, each with its latest reviews';
+
+
+-- Function for vector similarity search over a user's purchases
+-- Used by Agent 2 to find the user's purchases of products similar to the survey product
+
+CREATE OR REPLACE FUNCTION match_user_purchases(
+  query_embedding vector(1536),
+  match_user_id uuid,
+  match_threshold float DEFAULT 0.7,
+  match_count int DEFAULT 5,
+  history_count int DEFAULT 50
+)
+RETURNS TABLE (
+  transaction_id uuid,
+  item_id varchar,
+  user_id uuid,
+  order_date timestamp with time zone,
+  delivery_date timestamp with time zone,
+  expected_delivery_date timestamp with time zone,
+  return_date timestamp with time zone,
+  original_price numeric,
+  retail_price numeric,
+  transaction_status varchar,
+  is_mock boolean,
+  created_at timestamp with time zone,
+  updated_at timestamp with time zone,
+  products jsonb,
+  similarity_score float
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  RETURN QUERY
+  WITH recent AS (
+    -- Only the user's most recent purchases are considered
+    SELECT t.*
+    FROM transactions t
+    WHERE t.user_id = match_user_id
+    ORDER BY t.order_date DESC
+    LIMIT history_count
+  )
+  SELECT
+    r.transaction_id,
+    r.item_id,
+    r.user_id,
+    r.order_date,
+    r.delivery_date,
+    r.expected_delivery_date,
+    r.return_date,
+    r.original_price,
+    r.retail_price,
+    r.transaction_status,
+    r.is_mock,
+    r.created_at,
+    r.updated_at,
+    to_jsonb(p) - 'embeddings' AS products,
+    1 - (p.embeddings <=> query_embedding) AS similarity_score
+  FROM recent r
+  JOIN products p ON p.item_id = r.item_id
+  WHERE p.embeddings IS NOT NULL
+    AND 1 - (p.embeddings <=> query_embedding) >= match_threshold
+  ORDER BY p.embeddings <=> query_embedding
+  LIMIT match_count;
+END;
+$$;
+
+-- Add comment
+COMMENT ON FUNCTION match_user_purchases IS 'Find a user''s recent purchases of similar products using cosine similarity on embeddings';
+
+
+-- Function to save a survey review and the session's final state together
+-- Used by the review submission endpoint (one round-trip instead of INSERT then UPDATE)
+
+CREATE OR REPLACE FUNCTION save_review_with_session_context(
+  review_user_id uuid,
+  review_item_id varchar,
+  review_transaction_id uuid,
+  review_text text,
+  review_stars int,
+  review_title varchar,
+  review_embeddings vector(1536),
+  target_session_id uuid,
+  session_context jsonb
+)
+RETURNS uuid
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  new_review_id uuid;
+BEGIN
+  INSERT INTO reviews (
+    user_id,
+    item_id,
+    transaction_id,
+    review_text,
+    review_stars,
+    source,
+    manual_or_agent_generated,
+    review_title,
+    embeddings
+  )
+  VALUES (
+    review_user_id,
+    review_item_id,
+    review_transaction_id,
+    review_text,
+    review_stars,
+    'user_survey',
+    'agent',
+    review_title,
+    review_embeddings
+  )
+  RETURNING reviews.review_id INTO new_review_id;
+
+  -- The stored state records which review was saved
+  UPDATE survey_sessions s
+  SET session_context = save_review_with_session_context.session_context
+    || jsonb_build_object('review_id', new_review_id)
+  WHERE s.session_id = target_session_id;
+
+  RETURN new_review_id;
+END;
+$$;
+
+-- Add comment
+COMMENT ON FUNCTION save_review_with_session_context IS 'Insert a survey review and store the session''s final state (with review_id) in one transaction';
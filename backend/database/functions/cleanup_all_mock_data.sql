@@ -0,0 +1,28 @@
+-- Function to wipe all application data in a single call
+-- Used by the mock data generator to start each run from a clean database
+
+CREATE OR REPLACE FUNCTION cleanup_all_mock_data()
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  deleted_counts jsonb;
+BEGIN
+  -- Row counts are taken before truncating so callers can report what was removed
+  SELECT jsonb_build_object(
+    'survey_sessions', (SELECT count(*) FROM survey_sessions),
+    'reviews', (SELECT count(*) FROM reviews),
+    'transactions', (SELECT count(*) FROM transactions),
+    'users', (SELECT count(*) FROM users),
+    'products', (SELECT count(*) FROM products)
+  ) INTO deleted_counts;
+
+  -- CASCADE also empties survey_details (references survey_sessions)
+  TRUNCATE survey_sessions, reviews, transactions, users, products CASCADE;
+
+  RETURN deleted_counts;
+END;
+$$;
+
+-- Add comment
+COMMENT ON FUNCTION cleanup_all_mock_data IS 'Truncate all application tables and return the row counts removed per table';
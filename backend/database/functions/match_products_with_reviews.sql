@@ -0,0 +1,70 @@
+-- Function for vector similarity search on products, with their latest reviews
+-- Used by Agent 1 to fetch similar products and their reviews in one call
+
+CREATE OR REPLACE FUNCTION match_products_with_reviews(
+  query_embedding vector(1536),
+  match_threshold float DEFAULT 0.7,
+  match_count int DEFAULT 5,
+  review_limit int DEFAULT 10
+)
+RETURNS TABLE (
+  item_id varchar,
+  product_url text,
+  title text,
+  brand varchar,
+  category varchar,
+  price numeric,
+  description text,
+  review_count int,
+  similarity float,
+  reviews jsonb
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  RETURN QUERY
+  WITH matched AS (
+    SELECT
+      p.item_id,
+      p.product_url,
+      p.title,
+      p.brand,
+      p.category,
+      p.price,
+      p.description,
+      p.review_count,
+      1 - (p.embeddings <=> query_embedding) AS similarity
+    FROM products p
+    WHERE 1 - (p.embeddings <=> query_embedding) > match_threshold
+    ORDER BY p.embeddings <=> query_embedding
+    LIMIT match_count
+  )
+  SELECT
+    m.item_id,
+    m.product_url,
+    m.title,
+    m.brand,
+    m.category,
+    m.price,
+    m.description,
+    m.review_count,
+    m.similarity,
+    COALESCE(latest.reviews, '[]'::jsonb) AS reviews
+  FROM matched m
+  LEFT JOIN LATERAL (
+    -- Latest reviews per product (without their embeddings), newest first
+    SELECT jsonb_agg(to_jsonb(r) - 'embeddings' ORDER BY r.created_at DESC) AS reviews
+    FROM (
+      SELECT rv.*
+      FROM reviews rv
+      WHERE rv.item_id = m.item_id
+      ORDER BY rv.created_at DESC
+      LIMIT review_limit
+    ) r
+  ) latest ON true
+  ORDER BY m.similarity DESC;
+END;
+$$;
+
+-- Add comment
+COMMENT ON FUNCTION match_products_with_reviews IS 'Find similar products using cosine similarity on embeddings, each with its latest reviews';
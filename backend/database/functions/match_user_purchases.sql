@@ -0,0 +1,66 @@
+-- Function for vector similarity search over a user's purchases
+-- Used by Agent 2 to find the user's purchases of products similar to the survey product
+
+CREATE OR REPLACE FUNCTION match_user_purchases(
+  query_embedding vector(1536),
+  match_user_id uuid,
+  match_threshold float DEFAULT 0.7,
+  match_count int DEFAULT 5,
+  history_count int DEFAULT 50
+)
+RETURNS TABLE (
+  transaction_id uuid,
+  item_id varchar,
+  user_id uuid,
+  order_date timestamp with time zone,
+  delivery_date timestamp with time zone,
+  expected_delivery_date timestamp with time zone,
+  return_date timestamp with time zone,
+  original_price numeric,
+  retail_price numeric,
+  transaction_status varchar,
+  is_mock boolean,
+  created_at timestamp with time zone,
+  updated_at timestamp with time zone,
+  products jsonb,
+  similarity_score float
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  RETURN QUERY
+  WITH recent AS (
+    -- Only the user's most recent purchases are considered
+    SELECT t.*
+    FROM transactions t
+    WHERE t.user_id = match_user_id
+    ORDER BY t.order_date DESC
+    LIMIT history_count
+  )
+  SELECT
+    r.transaction_id,
+    r.item_id,
+    r.user_id,
+    r.order_date,
+    r.delivery_date,
+    r.expected_delivery_date,
+    r.return_date,
+    r.original_price,
+    r.retail_price,
+    r.transaction_status,
+    r.is_mock,
+    r.created_at,
+    r.updated_at,
+    to_jsonb(p) - 'embeddings' AS products,
+    1 - (p.embeddings <=> query_embedding) AS similarity_score
+  FROM recent r
+  JOIN products p ON p.item_id = r.item_id
+  WHERE p.embeddings IS NOT NULL
+    AND 1 - (p.embeddings <=> query_embedding) >= match_threshold
+  ORDER BY p.embeddings <=> query_embedding
+  LIMIT match_count;
+END;
+$$;
+
+-- Add comment
+COMMENT ON FUNCTION match_user_purchases IS 'Find a user''s recent purchases of similar products using cosine similarity on embeddings';
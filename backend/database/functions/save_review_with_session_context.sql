@@ -0,0 +1,56 @@
+-- Function to save a survey review and the session's final state together
+-- Used by the review submission endpoint (one round-trip instead of INSERT then UPDATE)
+
+CREATE OR REPLACE FUNCTION save_review_with_session_context(
+  review_user_id uuid,
+  review_item_id varchar,
+  review_transaction_id uuid,
+  review_text text,
+  review_stars int,
+  review_title varchar,
+  review_embeddings vector(1536),
+  target_session_id uuid,
+  session_context jsonb
+)
+RETURNS uuid
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  new_review_id uuid;
+BEGIN
+  INSERT INTO reviews (
+    user_id,
+    item_id,
+    transaction_id,
+    review_text,
+    review_stars,
+    source,
+    manual_or_agent_generated,
+    review_title,
+    embeddings
+  )
+  VALUES (
+    review_user_id,
+    review_item_id,
+    review_transaction_id,
+    review_text,
+    review_stars,
+    'user_survey',
+    'agent',
+    review_title,
+    review_embeddings
+  )
+  RETURNING reviews.review_id INTO new_review_id;
+
+  -- The stored state records which review was saved
+  UPDATE survey_sessions s
+  SET session_context = save_review_with_session_context.session_context
+    || jsonb_build_object('review_id', new_review_id)
+  WHERE s.session_id = target_session_id;
+
+  RETURN new_review_id;
+END;
+$$;
+
+-- Add comment
+COMMENT ON FUNCTION save_review_with_session_context IS 'Insert a survey review and store the session''s final state (with review_id) in one transaction';
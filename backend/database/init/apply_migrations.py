@@ -20,6 +20,51 @@ except Exception:
     SUPABASE_URL = os.getenv("SUPABASE_URL", "https://YOUR_PROJECT.supabase.co")
 
 
+# Read size when streaming SQL files to the console and the combined file
+COPY_CHUNK_SIZE = 64 * 1024
+
+# DROP statements at the beginning of the combined file for master reset capability
+DROP_STATEMENTS = """-- ============================================================================
+-- Survey Sensei - Master Reset Script
+-- ============================================================================
+-- This script drops all existing tables and recreates them from scratch
+-- WARNING: This will DELETE ALL DATA in the database!
+-- ============================================================================
+
+-- Drop tables in reverse dependency order (drop dependent tables first)
+DROP TABLE IF EXISTS survey_details CASCADE;
+DROP TABLE IF EXISTS reviews CASCADE;
+DROP TABLE IF EXISTS survey_sessions CASCADE;
+DROP TABLE IF EXISTS transactions CASCADE;
+DROP TABLE IF EXISTS users CASCADE;
+DROP TABLE IF EXISTS products CASCADE;
+
+-- Drop functions
+DROP FUNCTION IF EXISTS match_products(vector, int, int) CASCADE;
+DROP FUNCTION IF EXISTS match_products_with_reviews(vector, float, int, int) CASCADE;
+DROP FUNCTION IF EXISTS match_user_purchases(vector, uuid, float, int, int) CASCADE;
+DROP FUNCTION IF EXISTS cleanup_all_mock_data() CASCADE;
+DROP FUNCTION IF EXISTS save_review_with_session_context(uuid, varchar, uuid, text, int, varchar, vector, uuid, jsonb) CASCADE;
+DROP FUNCTION IF EXISTS update_updated_at_column() CASCADE;
+
+-- Note: Extensions are kept enabled (uuid-ossp, vector)
+-- ============================================================================
+
+"""
+
+
+def list_sql_files(directory: Path, exclude: str = "") -> list:
+    """Return the .sql files in a directory sorted by name (one scandir pass)"""
+    if not directory.exists():
+        return []
+    with os.scandir(directory) as entries:
+        names = sorted(
+            entry.name for entry in entries
+            if entry.name.endswith(".sql") and entry.name != exclude and entry.is_file()
+        )
+    return [directory / name for name in names]
+
+
 def execute_sql(sql: str) -> bool:
     """Execute SQL using Supabase REST API"""
 
@@ -49,13 +94,10 @@ def main():
         return 1
 
     # Get all SQL files from migrations directory (except the combined one)
-    migration_files = sorted([
-        f for f in migrations_dir.glob("*.sql")
-        if f.name != "_combined_migrations.sql"
-    ])
+    migration_files = list_sql_files(migrations_dir, exclude="_combined_migrations.sql")
 
     # Get all SQL files from functions directory
-    function_files = sorted(functions_dir.glob("*.sql")) if functions_dir.exists() else []
+    function_files = list_sql_files(functions_dir)
 
     # Combine migrations and functions (migrations first, then functions)
     sql_files = migration_files + function_files
@@ -79,14 +121,23 @@ def main():
     print("  Migration Contents")
     print("="*70 + "\n")
 
-    all_sql = []
+    # Save combined SQL to database root directory (not migrations subfolder)
+    database_dir = migrations_dir.parent
+    output_file = database_dir / "_combined_migrations.sql"
 
-    for sql_file in sql_files:
-        print(f"\n-- {sql_file.name} " + "-"*(65 - len(sql_file.name)))
-        with open(sql_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            print(content)
-            all_sql.append(content)
+    # Stream each file to the console and the combined file in one pass
+    with open(output_file, 'w', encoding='utf-8') as out:
+        out.write(DROP_STATEMENTS)
+        for i, sql_file in enumerate(sql_files):
+            print(f"\n-- {sql_file.name} " + "-"*(65 - len(sql_file.name)))
+            if i:
+                out.write("\n\n")
+            with open(sql_file, 'r', encoding='utf-8') as f:
+                # Fixed-size chunks keep memory flat without a console write per line
+                for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), ""):
+                    sys.stdout.write(chunk)
+                    out.write(chunk)
+            print()
 
     print("\n" + "="*70)
     print("  How to Apply These Migrations")
@@ -120,11 +171,10 @@ def main():
     print("\n\nOption 3: Copy Combined SQL to Clipboard")
     print("-" * 70)
 
-    combined_sql = "\n\n".join(all_sql)
-
     try:
         import pyperclip
-        pyperclip.copy(combined_sql)
+        # Migrations only - the DROP header stays out of the clipboard
+        pyperclip.copy(output_file.read_text(encoding='utf-8')[len(DROP_STATEMENTS):])
         print("SUCCESS: All SQL copied to clipboard!")
         print("        Paste directly into Supabase SQL Editor")
     except ImportError:
@@ -133,41 +183,6 @@ def main():
 
     print("\n" + "="*70 + "\n")
 
-    # Save combined SQL to database root directory (not migrations subfolder)
-    database_dir = migrations_dir.parent
-    output_file = database_dir / "_combined_migrations.sql"
-
-    # Add DROP statements at the beginning for master reset capability
-    drop_statements = """-- ============================================================================
--- Survey Sensei - Master Reset Script
--- ============================================================================
--- This script drops all existing tables and recreates them from scratch
--- WARNING: This will DELETE ALL DATA in the database!
--- ============================================================================
-
--- Drop tables in reverse dependency order (drop dependent tables first)
-DROP TABLE IF EXISTS survey_details CASCADE;
-DROP TABLE IF EXISTS reviews CASCADE;
-DROP TABLE IF EXISTS survey_sessions CASCADE;
-DROP TABLE IF EXISTS transactions CASCADE;
-DROP TABLE IF EXISTS users CASCADE;
-DROP TABLE IF EXISTS products CASCADE;
-
--- Drop functions
-DROP FUNCTION IF EXISTS match_products(vector, int, int) CASCADE;
-DROP FUNCTION IF EXISTS update_updated_at_column() CASCADE;
-
--- Note: Extensions are kept enabled (uuid-ossp, vector)
--- ============================================================================
-
-"""
-
-    # Combine: DROP statements + all migrations
-    final_sql = drop_statements + combined_sql
-
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(final_sql)
-
     print(f"Combined SQL saved to: {output_file}")
     print(f"You can copy this entire file into Supabase SQL Editor")
     print(f"\nWARNING: This file includes DROP TABLE statements for master reset")
@@ -39,6 +39,9 @@ CREATE INDEX IF NOT EXISTS idx_transactions_user_id ON transactions(user_id);
 CREATE INDEX IF NOT EXISTS idx_transactions_order_date ON transactions(order_date);
 CREATE INDEX IF NOT EXISTS idx_transactions_status ON transactions(transaction_status);
 CREATE INDEX IF NOT EXISTS idx_transactions_is_mock ON transactions(is_mock);
+-- A user's purchases newest first (purchase history, match_user_purchases) and of one product
+CREATE INDEX IF NOT EXISTS idx_transactions_user_order_date ON transactions(user_id, order_date DESC);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_item_order_date ON transactions(user_id, item_id, order_date DESC);
 
 -- Comments
 COMMENT ON TABLE transactions IS 'Purchase and delivery tracking';
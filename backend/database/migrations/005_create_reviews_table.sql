@@ -39,6 +39,9 @@ CREATE INDEX IF NOT EXISTS idx_reviews_stars ON reviews(review_stars);
 CREATE INDEX IF NOT EXISTS idx_reviews_embeddings ON reviews USING ivfflat(embeddings vector_cosine_ops) WITH (lists = 100);
 CREATE INDEX IF NOT EXISTS idx_reviews_source ON reviews(source);
 CREATE INDEX IF NOT EXISTS idx_reviews_manual_or_agent ON reviews(manual_or_agent_generated);
+-- Latest reviews of a product / by a user
+CREATE INDEX IF NOT EXISTS idx_reviews_item_created_at ON reviews(item_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_reviews_user_created_at ON reviews(user_id, created_at DESC);
 
 -- Comments
 COMMENT ON TABLE reviews IS 'User-generated reviews with AI-generated embeddings and sentiment';
@@ -33,6 +33,8 @@ CREATE TABLE survey_details (
 CREATE INDEX idx_survey_details_session_id ON survey_details(session_id);
 CREATE INDEX idx_survey_details_event_type ON survey_details(event_type);
 CREATE INDEX idx_survey_details_created_at ON survey_details(created_at);
+-- One session's events of a type in order (get_session_questions)
+CREATE INDEX idx_survey_details_session_event_created_at ON survey_details(session_id, event_type, created_at);
 
 -- Comments
 COMMENT ON TABLE survey_details IS 'Event log of all survey interactions for analytics and reconstruction';
@@ -0,0 +1,45 @@
+"""
+Shared survey session state store backed by Redis
+Lets several backend workers serve the same in-progress survey
+"""
+
+from typing import Any, Dict, Optional
+
+try:
+    import msgpack
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+class RedisSessionStore:
+    """In-progress survey state keyed by session_id, MessagePack-encoded with an idle TTL"""
+
+    KEY_PREFIX = "survey:"
+
+    def __init__(self, url: str, ttl_seconds: float):
+        if not REDIS_AVAILABLE:
+            raise ValueError("redis and msgpack must be installed to use a shared session store")
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = int(ttl_seconds)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a session's state and refresh its TTL
+
+        Returns:
+            State dict or None if the session is unknown or expired
+        """
+        payload = self.client.getex(self.KEY_PREFIX + session_id, ex=self.ttl_seconds)
+        if payload is None:
+            return None
+        return msgpack.unpackb(payload)
+
+    def set(self, session_id: str, state: Dict[str, Any]) -> None:
+        """Store a session's state (must be MessagePack-serializable)"""
+        self.client.set(self.KEY_PREFIX + session_id, msgpack.packb(state), ex=self.ttl_seconds)
+
+    def delete(self, session_id: str) -> None:
+        """Forget a finished session"""
+        self.client.delete(self.KEY_PREFIX + session_id)
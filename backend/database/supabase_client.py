@@ -4,10 +4,57 @@ Handles all database operations with vector similarity search
 """
 
 from supabase import create_client, Client
-from typing import List, Dict, Any, Optional
+from postgrest import AsyncPostgrestClient
+from postgrest.types import ReturnMethod
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
 from config import settings
-import numpy as np
+from utils.embeddings import to_pgvector
+from utils.serialization import json_loads
 import asyncio
+import httpx
+import time
+import uuid
+
+
+# Short-lived read cache for survey_sessions rows - absorbs repeat polls of the
+# same session; every write through this client invalidates the entry. This and
+# the row and vector search caches below are per-process, so all are off when
+# workers share state through Redis (settings.redis_url) and another worker may
+# write the rows
+SESSION_CACHE_TTL_SECONDS = 5.0
+SESSION_CACHE_MAX_ENTRIES = 1024
+
+# Product and user rows don't change during a survey, so lookups by key are
+# cached longer; the batch upserts and cleanup through this client invalidate them
+ROW_CACHE_TTL_SECONDS = 60.0
+ROW_CACHE_MAX_ENTRIES = 1024
+
+# Vector search results, keyed by the exact query embedding and search params -
+# the same product's embedding is searched again on every survey started for it
+SIMILAR_PRODUCTS_CACHE_TTL_SECONDS = 60.0
+SIMILAR_PRODUCTS_CACHE_MAX_ENTRIES = 256
+
+# Batch upserts are split into chunks of this many rows, sent a few at a time
+UPSERT_CHUNK_SIZE = 500
+UPSERT_CONCURRENCY = 4
+
+# Connection pool for PostgREST calls - idle connections are kept well past
+# httpx's 5s default so bursts of agent calls reuse warm TLS/HTTP2 sockets
+HTTP_POOL_LIMITS = httpx.Limits(
+    max_keepalive_connections=20, max_connections=50, keepalive_expiry=60.0
+)
+
+
+def _encode_embeddings(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copy of rows with list embeddings sent as pgvector literals (see to_pgvector)"""
+    return [
+        {**row, "embeddings": to_pgvector(row["embeddings"])}
+        if isinstance(row.get("embeddings"), list) else row
+        for row in rows
+    ]
 
 
 class SupabaseDB:
@@ -17,27 +64,157 @@ class SupabaseDB:
         self.client: Client = create_client(
             settings.supabase_url, settings.supabase_service_role_key
         )
+        # Swap the default PostgREST session for one with a longer-lived pool
+        postgrest = self.client.postgrest
+        default_session = postgrest.session
+        postgrest.session = httpx.Client(
+            base_url=default_session.base_url,
+            headers=default_session.headers,
+            timeout=default_session.timeout,
+            follow_redirects=True,
+            http2=True,
+            limits=HTTP_POOL_LIMITS,
+        )
+        default_session.close()
+        # session_id -> (expires_at, row), oldest first for LRU eviction
+        self._session_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._session_cache_lock = Lock()
+        # Bumped by every invalidation - a read that overlapped one doesn't cache
+        # its (possibly stale) row. session_id -> generation of its last
+        # invalidation, bounded like the cache; pruned entries raise the floor
+        self._session_cache_generation = 0
+        self._session_invalidated: "OrderedDict[str, int]" = OrderedDict()
+        self._session_invalidated_floor = 0
+        # (table, column, value) -> (expires_at, row), oldest first for LRU eviction
+        self._row_cache: "OrderedDict[Tuple[str, str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._row_cache_lock = Lock()
+        # Same scheme per table: table -> generation of its last invalidation
+        self._row_cache_generation = 0
+        self._row_invalidated: Dict[str, int] = {}
+        self._row_invalidated_floor = 0
+        self._local_caches_enabled = not settings.redis_url
+        # (pgvector literal, limit, threshold, review_limit) -> (expires_at, products)
+        self._similar_cache: "OrderedDict[Tuple[Any, ...], Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._similar_cache_lock = Lock()
+        # Bumped by every invalidation, which always clears the whole cache
+        self._similar_cache_generation = 0
+        # Async REST client for fire-and-forget writes from the event loop - bound
+        # to the loop it was created on, so it is (re)built lazily per loop
+        self._async_rest: Optional[Tuple[asyncio.AbstractEventLoop, AsyncPostgrestClient]] = None
+
+    def _async_rest_client(self) -> AsyncPostgrestClient:
+        """Async PostgREST client sharing the sync client's URL and auth headers"""
+        loop = asyncio.get_running_loop()
+        if self._async_rest is None or self._async_rest[0] is not loop:
+            if self._async_rest is not None:
+                self._close_async_rest(*self._async_rest)
+            session = self.client.postgrest.session
+            client = AsyncPostgrestClient(str(session.base_url), headers=dict(session.headers))
+            client.session = httpx.AsyncClient(
+                base_url=session.base_url,
+                headers=session.headers,
+                timeout=session.timeout,
+                follow_redirects=True,
+                http2=True,
+                limits=HTTP_POOL_LIMITS,
+            )
+            self._async_rest = (loop, client)
+        return self._async_rest[1]
+
+    @staticmethod
+    def _close_async_rest(old_loop: asyncio.AbstractEventLoop, client: AsyncPostgrestClient) -> None:
+        """Close a replaced async client - on its own loop if that still runs, else on this one"""
+        async def aclose() -> None:
+            try:
+                await client.aclose()
+            except Exception as e:
+                print(f"WARNING: Failed to close stale async REST client: {e}")
+
+        if old_loop.is_running():
+            asyncio.run_coroutine_threadsafe(aclose(), old_loop)
+        else:
+            asyncio.get_running_loop().create_task(aclose())
+
+    def _get_row_by(self, table: str, column: str, value: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the first row of table where column == value, via the row cache
+
+        The returned row is shared with the cache - treat it as read-only.
+        """
+        key = (table, column, value)
+        now = time.monotonic()
+        with self._row_cache_lock:
+            cached = self._row_cache.get(key) if self._local_caches_enabled else None
+            if cached and cached[0] > now:
+                self._row_cache.move_to_end(key)
+                return cached[1]
+            generation = self._row_cache_generation
+
+        response = self.client.table(table).select("*").eq(column, value).execute()
+        row = response.data[0] if response.data else None
+
+        if row:
+            # PostgREST returns vector columns as text - parse once, before caching
+            embeddings = row.get("embeddings")
+            if isinstance(embeddings, str):
+                row["embeddings"] = json_loads(embeddings)
+            with self._row_cache_lock:
+                invalidated = max(self._row_invalidated_floor, self._row_invalidated.get(table, 0))
+                if not self._local_caches_enabled or invalidated > generation:
+                    return row
+                self._row_cache[key] = (now + ROW_CACHE_TTL_SECONDS, row)
+                self._row_cache.move_to_end(key)
+                while len(self._row_cache) > ROW_CACHE_MAX_ENTRIES:
+                    self._row_cache.popitem(last=False)
+        return row
+
+    def _invalidate_row_cache(self, table: Optional[str] = None) -> None:
+        """Drop cached rows of one table (or of every table when table is None)"""
+        with self._row_cache_lock:
+            self._row_cache_generation += 1
+            if table is None:
+                self._row_cache.clear()
+                self._row_invalidated.clear()
+                self._row_invalidated_floor = self._row_cache_generation
+            else:
+                self._row_invalidated[table] = self._row_cache_generation
+                for key in [key for key in self._row_cache if key[0] == table]:
+                    del self._row_cache[key]
+
+    def _upsert_batched(self, table: str, rows: List[Dict[str, Any]], on_conflict: str) -> int:
+        """
+        Upsert rows in chunks of UPSERT_CHUNK_SIZE, up to UPSERT_CONCURRENCY at once
+
+        Rows are not echoed back (returning=minimal). Raises the first chunk error.
+        """
+        chunks = [
+            rows[start:start + UPSERT_CHUNK_SIZE]
+            for start in range(0, len(rows), UPSERT_CHUNK_SIZE)
+        ]
+
+        def upsert(chunk: List[Dict[str, Any]]) -> None:
+            self.client.table(table).upsert(
+                chunk, on_conflict=on_conflict, returning=ReturnMethod.minimal
+            ).execute()
+
+        if len(chunks) == 1:
+            upsert(chunks[0])
+        else:
+            with ThreadPoolExecutor(max_workers=min(UPSERT_CONCURRENCY, len(chunks))) as pool:
+                list(pool.map(upsert, chunks))
+        return len(rows)
 
     # ============================================================================
     # PRODUCT OPERATIONS
     # ============================================================================
 
     def get_product_by_id(self, product_id: str) -> Optional[Dict[str, Any]]:
-        """Get product by item_id"""
-        response = (
-            self.client.table("products").select("*").eq("item_id", product_id).execute()
-        )
-        return response.data[0] if response.data else None
+        """Get product by item_id (cached, see ROW_CACHE_TTL_SECONDS)"""
+        return self._get_row_by("products", "item_id", product_id)
 
     def get_product_by_url(self, product_url: str) -> Optional[Dict[str, Any]]:
-        """Get product by product_url"""
-        response = (
-            self.client.table("products")
-            .select("*")
-            .eq("product_url", product_url)
-            .execute()
-        )
-        return response.data[0] if response.data else None
+        """Get product by product_url (cached, see ROW_CACHE_TTL_SECONDS)"""
+        return self._get_row_by("products", "product_url", product_url)
 
     def get_product_reviews(self, product_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Get all reviews for a specific product"""
@@ -51,43 +228,101 @@ class SupabaseDB:
         )
         return response.data
 
+    def get_reviews_for_products(
+        self, product_ids: List[str], limit: int = 10
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get the latest reviews for several products in one request
+
+        Reviews are embedded under their products and limited per product by
+        PostgREST, so this is a single round-trip however many products are asked for.
+
+        Returns:
+            item_id -> reviews (newest first); products without reviews map to []
+        """
+        if not product_ids:
+            return {}
+        query = (
+            self.client.table("products")
+            .select("item_id, reviews(*)")
+            .in_("item_id", product_ids)
+            .limit(limit, foreign_table="reviews")
+        )
+        # postgrest-py renders foreign_table ordering as order=reviews(col), which
+        # PostgREST reads as ordering the products - set the embedded order directly
+        query.params = query.params.add("reviews.order", "created_at.desc")
+        response = query.execute()
+        return {row["item_id"]: row.get("reviews") or [] for row in response.data}
+
     def find_similar_products(
-        self, product_embedding: List[float], limit: int = 5, threshold: float = 0.7
+        self,
+        product_embedding: List[float],
+        limit: int = 5,
+        threshold: float = 0.7,
+        review_limit: int = 0,
     ) -> List[Dict[str, Any]]:
         """
         Find similar products using vector similarity search
         Uses pgvector cosine similarity
-        """
-        # Convert embedding to numpy array for processing
-        query_embedding = np.array(product_embedding)
 
-        # Execute vector similarity search using RPC function
-        response = self.client.rpc(
-            "match_products",
-            {
-                "query_embedding": query_embedding.tolist(),
-                "match_threshold": threshold,
-                "match_count": limit,
-            },
-        ).execute()
+        With review_limit > 0, each product also carries its latest reviews
+        (newest first, at most review_limit) under "reviews", fetched in the same RPC.
 
-        return response.data if response.data else []
+        Results are cached briefly per exact query (see SIMILAR_PRODUCTS_CACHE_TTL_SECONDS).
+        The product dicts are shared with the cache - treat them as read-only.
+        """
+        query_embedding = to_pgvector(product_embedding)
+        key = (query_embedding, limit, threshold, review_limit)
+        now = time.monotonic()
+        with self._similar_cache_lock:
+            cached = self._similar_cache.get(key) if self._local_caches_enabled else None
+            if cached and cached[0] > now:
+                self._similar_cache.move_to_end(key)
+                return list(cached[1])
+            generation = self._similar_cache_generation
+
+        params = {
+            "query_embedding": query_embedding,
+            "match_threshold": threshold,
+            "match_count": limit,
+        }
+        # Execute vector similarity search using RPC function
+        if review_limit > 0:
+            params["review_limit"] = review_limit
+            response = self.client.rpc("match_products_with_reviews", params).execute()
+        else:
+            response = self.client.rpc("match_products", params).execute()
+        products = response.data if response.data else []
+
+        with self._similar_cache_lock:
+            if not self._local_caches_enabled or self._similar_cache_generation > generation:
+                return list(products)
+            self._similar_cache[key] = (now + SIMILAR_PRODUCTS_CACHE_TTL_SECONDS, products)
+            self._similar_cache.move_to_end(key)
+            while len(self._similar_cache) > SIMILAR_PRODUCTS_CACHE_MAX_ENTRIES:
+                self._similar_cache.popitem(last=False)
+        return list(products)
+
+    def _invalidate_similar_products_cache(self) -> None:
+        """Drop all cached vector search results"""
+        with self._similar_cache_lock:
+            self._similar_cache_generation += 1
+            self._similar_cache.clear()
+
+    def _invalidate_review_caches(self) -> None:
+        """Drop cached data that embeds reviews or review_count after a reviews write"""
+        self._invalidate_row_cache("products")
+        self._invalidate_similar_products_cache()
 
     def get_similar_products_with_reviews(
         self, product_embedding: List[float], limit: int = 5
     ) -> List[Dict[str, Any]]:
         """Get similar products that have reviews"""
-        similar_products = self.find_similar_products(product_embedding, limit=limit)
-
-        # Filter products that have reviews
-        products_with_reviews = []
-        for product in similar_products:
-            reviews = self.get_product_reviews(product["item_id"], limit=10)
-            if reviews:
-                product["reviews"] = reviews
-                products_with_reviews.append(product)
-
-        return products_with_reviews
+        # Reviews come back embedded in the vector search results (one RPC)
+        similar_products = self.find_similar_products(
+            product_embedding, limit=limit, review_limit=10
+        )
+        return [product for product in similar_products if product.get("reviews")]
 
     # ============================================================================
     # CLEANUP OPERATIONS
@@ -112,28 +347,16 @@ class SupabaseDB:
         deleted_counts = {}
 
         try:
-            # STEP 1: Delete all survey sessions
-            survey_sessions_resp = self.client.table("survey_sessions").delete().neq("session_id", "00000000-0000-0000-0000-000000000000").execute()
-            deleted_counts['survey_sessions'] = len(survey_sessions_resp.data) if survey_sessions_resp.data else 0
-
-            # STEP 2: Delete ALL reviews (cascade will handle this, but explicit is better)
-            reviews_resp = self.client.table("reviews").delete().neq("review_id", "00000000-0000-0000-0000-000000000000").execute()
-            deleted_counts['reviews'] = len(reviews_resp.data) if reviews_resp.data else 0
-
-            # STEP 3: Delete ALL transactions
-            txn_resp = self.client.table("transactions").delete().neq("transaction_id", "00000000-0000-0000-0000-000000000000").execute()
-            deleted_counts['transactions'] = len(txn_resp.data) if txn_resp.data else 0
-
-            # STEP 4: Delete ALL users (including previous main users)
-            users_resp = self.client.table("users").delete().neq("user_id", "00000000-0000-0000-0000-000000000000").execute()
-            deleted_counts['users'] = len(users_resp.data) if users_resp.data else 0
-
-            # STEP 5: Delete ALL products (including previous main products)
-            products_resp = self.client.table("products").delete().neq("item_id", "DUMMY_ITEM_ID").execute()
-            deleted_counts['products'] = len(products_resp.data) if products_resp.data else 0
-
+            # One TRUNCATE ... CASCADE in Postgres (cleanup_all_mock_data RPC)
+            # instead of a full-table DELETE per table
+            response = self.client.rpc("cleanup_all_mock_data", {}).execute()
+            deleted_counts = response.data or {}
         except Exception as e:
             print(f"Warning during cleanup: {str(e)}")
+        finally:
+            self._invalidate_session_cache()
+            self._invalidate_row_cache()
+            self._invalidate_similar_products_cache()
 
         return deleted_counts
 
@@ -155,25 +378,23 @@ class SupabaseDB:
             return 0
 
         try:
-            response = self.client.table("products").upsert(
-                products,
-                on_conflict="item_id"
-            ).execute()
-            return len(products)
+            return self._upsert_batched(
+                "products", _encode_embeddings(products), on_conflict="item_id"
+            )
         except Exception as e:
             print(f"Failed to insert products: {str(e)}")
             raise
+        finally:
+            self._invalidate_row_cache("products")
+            self._invalidate_similar_products_cache()
 
     # ============================================================================
     # USER OPERATIONS
     # ============================================================================
 
     def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
-        """Get user by user_id"""
-        response = (
-            self.client.table("users").select("*").eq("user_id", user_id).execute()
-        )
-        return response.data[0] if response.data else None
+        """Get user by user_id (cached, see ROW_CACHE_TTL_SECONDS)"""
+        return self._get_row_by("users", "user_id", user_id)
 
     def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """Get user by email_id"""
@@ -262,51 +483,35 @@ class SupabaseDB:
             return 0
 
         try:
-            response = self.client.table("users").upsert(
-                users,
-                on_conflict="email_id"  # Use email_id since it has UNIQUE constraint
-            ).execute()
-            return len(users)
+            # Use email_id since it has UNIQUE constraint
+            return self._upsert_batched("users", users, on_conflict="email_id")
         except Exception as e:
             print(f"Failed to insert users: {str(e)}")
             raise
+        finally:
+            self._invalidate_row_cache("users")
 
     def find_user_similar_product_purchases(
         self, user_id: str, product_embedding: List[float], limit: int = 5
     ) -> List[Dict[str, Any]]:
         """
         Find user's purchases of similar products using embeddings
-        Returns transactions with product details
-        """
-        # Get user's transaction history
-        transactions = self.get_user_transactions(user_id, limit=50)
+        Returns transactions with product details (without embeddings) and similarity_score
 
-        if not transactions:
-            return []
-
-        # Calculate similarity for each transaction's product
-        query_embedding = np.array(product_embedding)
-        similar_transactions = []
-
-        for txn in transactions:
-            if txn.get("products") and txn["products"].get("embeddings"):
-                # Parse embedding if it's a JSON string
-                emb_data = txn["products"]["embeddings"]
-                if isinstance(emb_data, str):
-                    import json
-                    emb_data = json.loads(emb_data)
-                product_emb = np.array(emb_data)
-                similarity = np.dot(query_embedding, product_emb) / (
-                    np.linalg.norm(query_embedding) * np.linalg.norm(product_emb)
-                )
-
-                if similarity >= settings.similarity_threshold:
-                    txn["similarity_score"] = float(similarity)
-                    similar_transactions.append(txn)
+        Similarity is computed in Postgres (match_user_purchases RPC) over the
+        user's 50 most recent transactions
+        """
+        response = self.client.rpc(
+            "match_user_purchases",
+            {
+                "query_embedding": to_pgvector(product_embedding),
+                "match_user_id": user_id,
+                "match_threshold": settings.similarity_threshold,
+                "match_count": limit,
+            },
+        ).execute()
 
-        # Sort by similarity and return top matches
-        similar_transactions.sort(key=lambda x: x["similarity_score"], reverse=True)
-        return similar_transactions[:limit]
+        return response.data if response.data else []
 
     def insert_transactions_batch(self, transactions: List[Dict[str, Any]]) -> int:
         """
@@ -322,11 +527,7 @@ class SupabaseDB:
             return 0
 
         try:
-            response = self.client.table("transactions").upsert(
-                transactions,
-                on_conflict="transaction_id"
-            ).execute()
-            return len(transactions)
+            return self._upsert_batched("transactions", transactions, on_conflict="transaction_id")
         except Exception as e:
             print(f"Failed to insert transactions: {str(e)}")
             raise
@@ -345,14 +546,14 @@ class SupabaseDB:
             return 0
 
         try:
-            response = self.client.table("reviews").upsert(
-                reviews,
-                on_conflict="review_id"
-            ).execute()
-            return len(reviews)
+            return self._upsert_batched(
+                "reviews", _encode_embeddings(reviews), on_conflict="review_id"
+            )
         except Exception as e:
             print(f"Failed to insert reviews: {str(e)}")
             raise
+        finally:
+            self._invalidate_review_caches()
 
     # ============================================================================
     # SURVEY OPERATIONS - NEW SCHEMA
@@ -382,55 +583,109 @@ class SupabaseDB:
         Returns:
             session_id: Created session UUID
         """
-        response = self.client.table("survey_sessions").insert({
-            "user_id": user_id,
-            "item_id": item_id,
-            "transaction_id": transaction_id,
-            "product_context": product_context,  # JSONB - frozen after start
-            "customer_context": customer_context  # JSONB - frozen after start
-        }).execute()
+        # session_id is generated here so the row (with both contexts) isn't echoed back
+        session_id = str(uuid.uuid4())
+        self.client.table("survey_sessions").insert(
+            {
+                "session_id": session_id,
+                "user_id": user_id,
+                "item_id": item_id,
+                "transaction_id": transaction_id,
+                "product_context": product_context,  # JSONB - frozen after start
+                "customer_context": customer_context  # JSONB - frozen after start
+            },
+            returning=ReturnMethod.minimal,
+        ).execute()
 
-        return response.data[0]["session_id"] if response.data else None
+        return session_id
 
     def get_survey_session(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """Get survey session by ID"""
+        """
+        Get survey session by ID
+
+        Served from a short TTL cache when the same session was read in the last
+        few seconds. The returned row is shared with the cache - treat it as read-only.
+        """
+        now = time.monotonic()
+        with self._session_cache_lock:
+            cached = self._session_cache.get(session_id) if self._local_caches_enabled else None
+            if cached and cached[0] > now:
+                self._session_cache.move_to_end(session_id)
+                return cached[1]
+            generation = self._session_cache_generation
+
         response = (
             self.client.table("survey_sessions")
             .select("*")
             .eq("session_id", session_id)
             .execute()
         )
-        return response.data[0] if response.data else None
+        session = response.data[0] if response.data else None
+
+        if session:
+            with self._session_cache_lock:
+                invalidated = max(
+                    self._session_invalidated_floor, self._session_invalidated.get(session_id, 0)
+                )
+                if not self._local_caches_enabled or invalidated > generation:
+                    return session
+                self._session_cache[session_id] = (now + SESSION_CACHE_TTL_SECONDS, session)
+                self._session_cache.move_to_end(session_id)
+                while len(self._session_cache) > SESSION_CACHE_MAX_ENTRIES:
+                    self._session_cache.popitem(last=False)
+        return session
+
+    def _invalidate_session_cache(self, session_id: Optional[str] = None) -> None:
+        """Drop a cached survey session row (or all rows when session_id is None)"""
+        with self._session_cache_lock:
+            self._session_cache_generation += 1
+            if session_id is None:
+                self._session_cache.clear()
+                self._session_invalidated.clear()
+                self._session_invalidated_floor = self._session_cache_generation
+            else:
+                self._session_cache.pop(session_id, None)
+                self._session_invalidated[session_id] = self._session_cache_generation
+                self._session_invalidated.move_to_end(session_id)
+                while len(self._session_invalidated) > SESSION_CACHE_MAX_ENTRIES:
+                    _, pruned = self._session_invalidated.popitem(last=False)
+                    self._session_invalidated_floor = max(self._session_invalidated_floor, pruned)
 
     def update_review_options(
         self,
         session_id: str,
         review_options: List[Dict[str, Any]],
-        sentiment_band: str
+        sentiment_band: str,
+        session_context: Optional[Dict[str, Any]] = None
     ) -> bool:
         """
         Update review_options JSONB field with generated review options
 
+        When session_context is given it is written in the same UPDATE.
+
         Args:
             session_id: Session UUID
             review_options: List of review option dicts (review_title, review_text, review_stars, tone, highlights)
             sentiment_band: Sentiment classification (good/okay/bad)
+            session_context: Optional survey agent state to store alongside
 
         Returns:
-            bool: True if update successful
+            bool: True once the UPDATE is accepted (errors raise)
         """
-        response = (
-            self.client.table("survey_sessions")
-            .update({
-                "review_options": {
-                    "options": review_options,
-                    "sentiment_band": sentiment_band
-                }
-            })
-            .eq("session_id", session_id)
-            .execute()
-        )
-        return bool(response.data)
+        update_fields: Dict[str, Any] = {
+            "review_options": {
+                "options": review_options,
+                "sentiment_band": sentiment_band
+            }
+        }
+        if session_context is not None:
+            update_fields["session_context"] = session_context
+
+        self.client.table("survey_sessions").update(
+            update_fields, returning=ReturnMethod.minimal
+        ).eq("session_id", session_id).execute()
+        self._invalidate_session_cache(session_id)
+        return True
 
     def update_session_context(
         self,
@@ -447,41 +702,47 @@ class SupabaseDB:
             session_context: Complete survey agent state (answers, questions, conversation_history, etc.)
 
         Returns:
-            bool: True if update successful
+            bool: True once the UPDATE is accepted (errors raise)
         """
-        response = (
-            self.client.table("survey_sessions")
-            .update({"session_context": session_context})
-            .eq("session_id", session_id)
-            .execute()
-        )
-        return bool(response.data)
+        # return=minimal - the row (with its large JSONB columns) isn't echoed back
+        self.client.table("survey_sessions").update(
+            {"session_context": session_context}, returning=ReturnMethod.minimal
+        ).eq("session_id", session_id).execute()
+        self._invalidate_session_cache(session_id)
+        return True
 
     def complete_survey_session(
         self,
         session_id: str,
-        questions_and_answers: List[Dict[str, Any]]
+        questions_and_answers: List[Dict[str, Any]],
+        session_context: Optional[Dict[str, Any]] = None
     ) -> bool:
         """
         Complete survey session with final Q&A
 
         Populates questions_and_answers JSONB and marks survey complete.
         Called when survey reaches completion (not aborted).
+        When session_context is given it is written in the same UPDATE,
+        so completion costs a single round-trip.
 
         Args:
             session_id: Session UUID
             questions_and_answers: List of Q&A dicts (question_number, question_text, selected_option, timestamp)
+            session_context: Optional final survey agent state to store alongside
 
         Returns:
-            bool: True if update successful
+            bool: True once the UPDATE is accepted (errors raise)
         """
-        response = (
-            self.client.table("survey_sessions")
-            .update({"questions_and_answers": questions_and_answers})
-            .eq("session_id", session_id)
-            .execute()
-        )
-        return bool(response.data)
+        update_fields: Dict[str, Any] = {"questions_and_answers": questions_and_answers}
+        if session_context is not None:
+            update_fields["session_context"] = session_context
+
+        # return=minimal - the row (with its large JSONB columns) isn't echoed back
+        self.client.table("survey_sessions").update(
+            update_fields, returning=ReturnMethod.minimal
+        ).eq("session_id", session_id).execute()
+        self._invalidate_session_cache(session_id)
+        return True
 
     # ASYNC EVENT LOGGING (FIRE-AND-FORGET)
 
@@ -543,6 +804,47 @@ class SupabaseDB:
             event_detail
         )
 
+    async def insert_survey_details_bulk_async(self, events: List[Dict[str, Any]]) -> int:
+        """
+        Bulk survey event logging on the event loop (no worker thread hop)
+
+        Args:
+            events: Rows with session_id, event_type and event_detail keys
+
+        Returns:
+            int: Number of events inserted (0 if failed)
+        """
+        if not events:
+            return 0
+        try:
+            await self._async_rest_client().table("survey_details").insert(
+                events, returning=ReturnMethod.minimal
+            ).execute()
+            return len(events)
+        except Exception as e:
+            print(f"Failed to log {len(events)} survey events: {e}")
+            return 0
+
+    def get_session_questions(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Get all questions asked in a survey session, in the order they were asked
+
+        Read from the session's question_generated events (survey_details is
+        indexed on session_id).
+
+        Returns:
+            List of question_generated event_detail dicts
+        """
+        response = (
+            self.client.table("survey_details")
+            .select("event_detail")
+            .eq("session_id", session_id)
+            .eq("event_type", "question_generated")
+            .order("created_at")
+            .execute()
+        )
+        return [row["event_detail"] for row in response.data if row.get("event_detail")]
+
     # ============================================================================
     # REVIEW OPERATIONS
     # ============================================================================
@@ -555,11 +857,15 @@ class SupabaseDB:
         rating: int,
         sentiment_label: str,
         metadata: Dict[str, Any],
+        session_context: Optional[Dict[str, Any]] = None,
     ) -> str:
         """
         Save generated review to database with embeddings
 
         Uses EXISTING transaction_id (created during data engineering SMP→SVP)
+        When session_context is given, it is stored on the survey session
+        (metadata["session_id"]) with the new review_id added, in the same
+        round-trip as the INSERT.
         """
         from utils.embeddings import embedding_service
 
@@ -572,28 +878,70 @@ class SupabaseDB:
             )
 
         # Generate embedding for the review text
-        review_embedding = embedding_service.generate_embedding(review_text)
+        review_embedding = to_pgvector(embedding_service.generate_embedding(review_text))
 
-        # Insert review with embeddings and correct field names from schema
-        response = (
-            self.client.table("reviews")
-            .insert(
+        if session_context is not None:
+            session_id = metadata.get("session_id")
+            response = self.client.rpc(
+                "save_review_with_session_context",
                 {
-                    "user_id": user_id,
-                    "item_id": item_id,
-                    "transaction_id": transaction_id,  # Uses existing transaction from data engineering
+                    "review_user_id": user_id,
+                    "review_item_id": item_id,
+                    "review_transaction_id": transaction_id,
                     "review_text": review_text,
                     "review_stars": rating,
-                    "source": "user_survey",  # Review submitted via survey (user selected from AI-generated options)
-                    "manual_or_agent_generated": "agent",  # AI-generated text, user-selected
-                    "review_title": metadata.get("review_title", "Product Review"),  # Use title from review option
-                    "embeddings": review_embedding,
-                }
-            )
-            .execute()
-        )
-        return response.data[0]["review_id"] if response.data else None
+                    "review_title": metadata.get("review_title", "Product Review"),
+                    "review_embeddings": review_embedding,
+                    "target_session_id": session_id,
+                    "session_context": session_context,
+                },
+            ).execute()
+            self._invalidate_session_cache(session_id)
+            self._invalidate_review_caches()
+            return response.data
+
+        # Insert review with embeddings and correct field names from schema.
+        # review_id is generated here so the row (and its embedding) isn't echoed back
+        review_id = str(uuid.uuid4())
+        self.client.table("reviews").insert(
+            {
+                "review_id": review_id,
+                "user_id": user_id,
+                "item_id": item_id,
+                "transaction_id": transaction_id,  # Uses existing transaction from data engineering
+                "review_text": review_text,
+                "review_stars": rating,
+                "source": "user_survey",  # Review submitted via survey (user selected from AI-generated options)
+                "manual_or_agent_generated": "agent",  # AI-generated text, user-selected
+                "review_title": metadata.get("review_title", "Product Review"),  # Use title from review option
+                "embeddings": review_embedding,
+            },
+            returning=ReturnMethod.minimal,
+        ).execute()
+        self._invalidate_review_caches()
+        return review_id
+
+
+_db: Optional[SupabaseDB] = None
+_db_lock = Lock()
+
+
+def get_db() -> SupabaseDB:
+    """Global database instance, created on first use"""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = SupabaseDB()
+    return _db
+
+
+class _LazySupabaseDB:
+    """Stands in for the global instance until first attribute access"""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_db(), name)
 
 
-# Global database instance
-db = SupabaseDB()
+# Global database instance (the Supabase client is built on first use)
+db = _LazySupabaseDB()
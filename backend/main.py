@@ -13,8 +13,9 @@ from agents.mock_data import MockDataOrchestrator, build_scenario_config
 from integrations import RapidAPIClient
 from database import db
 import uvicorn
+import asyncio
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 from utils.logger import setup_logging, get_logger
 
 # Setup enhanced logging
@@ -57,6 +58,12 @@ async def log_requests(request: Request, call_next):
     return response
 
 
+@app.on_event("shutdown")
+async def flush_survey_events():
+    """Write any batched survey_details events before the process exits"""
+    await survey_agent.flush_events()
+
+
 class GenerateMockDataRequest(BaseModel):
     """Request for generating mock data (FORM -> SUMMARY transition)"""
     user_id: str
@@ -347,7 +354,7 @@ async def start_survey(request: StartSurveyRequest):
         logger.info(f"📝 Starting survey session for user: {request.user_id}, product: {request.item_id}")
 
         # Start survey with main user and main product (data already in database)
-        result = survey_agent.start_survey(
+        result = await survey_agent.start_survey(
             user_id=request.user_id,
             item_id=request.item_id,
             form_data=request.form_data,
@@ -375,7 +382,7 @@ async def start_survey(request: StartSurveyRequest):
 async def submit_answer(request: SubmitAnswerRequest):
     """Submit answer, get next question or completion status"""
     try:
-        result = survey_agent.submit_answer(
+        result = await survey_agent.submit_answer(
             session_id=request.session_id,
             answer=request.answer,
         )
@@ -407,7 +414,7 @@ async def submit_answer(request: SubmitAnswerRequest):
 async def skip_question(request: SkipQuestionRequest):
     """Skip question and move to next"""
     try:
-        result = survey_agent.skip_question(session_id=request.session_id)
+        result = await survey_agent.skip_question(session_id=request.session_id)
 
         if result.get("status") == "survey_completed":
             return SubmitAnswerResponse(
@@ -442,7 +449,7 @@ async def get_question_for_edit(request: GetQuestionForEditRequest):
     """Get original question for editing (works for both answered and skipped questions)"""
     try:
         print(f"GET QUESTION FOR EDIT - Session: {request.session_id}, Question: {request.question_number}")
-        result = survey_agent.get_question_for_edit(
+        result = await survey_agent.get_question_for_edit(
             session_id=request.session_id,
             question_number=request.question_number,
         )
@@ -466,7 +473,7 @@ async def get_question_for_edit(request: GetQuestionForEditRequest):
 async def edit_answer(request: EditAnswerRequest):
     """Edit previous answer and branch from that point"""
     try:
-        result = survey_agent.edit_answer(
+        result = await survey_agent.edit_answer(
             session_id=request.session_id,
             question_number=request.question_number,
             new_answer=request.answer,
@@ -503,18 +510,26 @@ async def generate_reviews(request: GenerateReviewsRequest):
             raise HTTPException(status_code=404, detail="Session not found")
 
         # Get current survey state from survey_agent's in-memory cache
-        current_state = survey_agent.get_survey_state(request.session_id)
+        # (falls back to the session row fetched above - no second query)
+        current_state = await asyncio.to_thread(
+            survey_agent.get_survey_state, request.session_id, session=session
+        )
 
         # Get item_id and user_id from top-level session
         item_id = session.get("item_id")
         user_id = session.get("user_id")
 
-        product = db.get_product_by_id(item_id)
+        # Product and the user's past reviews are independent reads - fetch concurrently
+        if user_id:
+            product, user_reviews = await asyncio.gather(
+                asyncio.to_thread(db.get_product_by_id, item_id),
+                asyncio.to_thread(db.get_user_reviews, user_id, limit=10),
+            )
+        else:
+            product, user_reviews = db.get_product_by_id(item_id), []
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
 
-        user_reviews = db.get_user_reviews(user_id, limit=10) if user_id else []
-
         # Prepare review generation inputs (for audit trail)
         review_gen_inputs = {
             "survey_responses": current_state.get("answers", []),
@@ -539,22 +554,18 @@ async def generate_reviews(request: GenerateReviewsRequest):
             user_reviews=user_reviews,
         )
 
-        # Store all 3 review options in review_options column
+        # Store all 3 review options in review_options column, and session_context
+        # with the review generation inputs (audit trail), in one UPDATE
         review_options_list = [r.dict() for r in review_options.reviews]
-        db.update_review_options(
-            session_id=request.session_id,
-            review_options=review_options_list,
-            sentiment_band=review_options.sentiment_band,
-        )
-
-        # Update session_context with review generation inputs (audit trail)
         updated_session_context = {
             **current_state,  # Keep existing survey state
             "review_generation_inputs": review_gen_inputs,  # Add review gen inputs
-            "review_generated_at": datetime.utcnow().isoformat(),
+            "review_generated_at": datetime.now(timezone.utc).isoformat(),
         }
-        db.update_session_context(
+        db.update_review_options(
             session_id=request.session_id,
+            review_options=review_options_list,
+            sentiment_band=review_options.sentiment_band,
             session_context=updated_session_context,
         )
 
@@ -641,8 +652,13 @@ async def submit_review(request: SubmitReviewRequest):
         item_id = session.get("item_id")
         transaction_id = session.get("transaction_id")
 
-        # Save selected review to reviews table
-        review_id = db.save_generated_review(
+        # Current survey state is stored in session_context at completion
+        current_state = await asyncio.to_thread(
+            survey_agent.get_survey_state, request.session_id, session=session
+        )
+
+        # Save selected review to reviews table (and session_context, in one call)
+        db.save_generated_review(
             user_id=user_id,
             item_id=item_id,
             review_text=selected_review.get("review_text"),
@@ -656,16 +672,10 @@ async def submit_review(request: SubmitReviewRequest):
                 "transaction_id": transaction_id,
                 "review_title": selected_review.get("review_title", "Product Review"),
             },
-        )
-
-        # Get current survey state and store it in session_context at completion
-        current_state = survey_agent.get_survey_state(request.session_id)
-        db.update_session_context(
-            session_id=request.session_id,
             session_context={
                 **current_state,  # Complete survey agent state
                 "selected_review_index": request.selected_review_index,
-                "review_id": review_id,
+                # review_id is added by the database once the review row exists
             },
         )
 
@@ -5,7 +5,7 @@ Tests the complete API workflow
 
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch, Mock
+from unittest.mock import patch, AsyncMock
 from main import app
 
 
@@ -327,14 +327,14 @@ def test_method_not_allowed(client):
 def test_complete_survey_workflow(mock_agent, mock_db, client, mock_form_data):
     """Test complete survey workflow from start to review submission"""
     # Mock agent responses
-    mock_agent.start_survey.return_value = {
+    mock_agent.start_survey = AsyncMock(return_value={
         "session_id": "session-123",
         "question": {"question_text": "Q1", "options": ["A", "B"]},
         "question_number": 1,
         "total_questions": 2,
-    }
+    })
 
-    mock_agent.submit_answer.side_effect = [
+    mock_agent.submit_answer = AsyncMock(side_effect=[
         {
             "session_id": "session-123",
             "question": {"question_text": "Q2", "options": ["C", "D"]},
@@ -348,7 +348,7 @@ def test_complete_survey_workflow(mock_agent, mock_db, client, mock_form_data):
                 {"review_text": "Great!", "rating": 5, "sentiment": "positive"}
             ],
         },
-    ]
+    ])
 
     mock_agent.submit_review.return_value = {
         "session_id": "session-123",
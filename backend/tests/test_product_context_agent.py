@@ -252,11 +252,8 @@ class TestProductContextAgent:
         """Test Path 2: No direct reviews but similar products have reviews"""
         # Setup mocks
         mock_db.get_product_by_id.return_value = mock_product_without_reviews
+        # Reviews come embedded in the vector search results
         mock_db.find_similar_products.return_value = mock_similar_products
-        mock_db.get_product_reviews.side_effect = lambda item_id, limit: (
-            mock_similar_products[0]["reviews"] if item_id == "B08SIMILAR1"
-            else mock_similar_products[1]["reviews"]
-        )
 
         # Mock LLM response
         with patch.object(agent.llm, 'invoke', return_value=mock_llm_response_path2):
@@ -268,8 +265,10 @@ class TestProductContextAgent:
         assert 0.55 <= context.confidence_score <= 0.80
         assert len(context.key_features) > 0
 
-        # Verify vector search was called
+        # Verify vector search was called, fetching reviews in the same request
         mock_db.find_similar_products.assert_called_once()
+        assert mock_db.find_similar_products.call_args.kwargs["review_limit"] == 10
+        mock_db.get_reviews_for_products.assert_not_called()
 
     @patch('agents.product_context_agent.db')
     def test_path2_confidence_calculation(
@@ -282,10 +281,6 @@ class TestProductContextAgent:
         """Test Path 2: Confidence score calculation based on similar products count"""
         mock_db.get_product_by_id.return_value = mock_product_without_reviews
         mock_db.find_similar_products.return_value = mock_similar_products
-        mock_db.get_product_reviews.side_effect = lambda item_id, limit: (
-            mock_similar_products[0]["reviews"] if item_id == "B08SIMILAR1"
-            else mock_similar_products[1]["reviews"]
-        )
 
         mock_llm_response = Mock(content='{"key_features": [], "major_concerns": [], "pros": [], "cons": [], "common_use_cases": []}')
 
@@ -605,20 +600,25 @@ class TestProductContextAgent:
     ):
         """Test that similar products search excludes the main product itself"""
         # Mock similar products that includes the main product
+        reviews = [{"review_stars": 5, "review_text": "Great!"}] * 10
         similar_with_self = [
-            {"item_id": "B0NEWPRODUCT", "review_count": 0},  # Main product (should be excluded)
-            {"item_id": "B08SIMILAR1", "review_count": 100}
+            {"item_id": "B0NEWPRODUCT", "review_count": 0, "reviews": []},  # Main product (should be excluded)
+            {"item_id": "B08SIMILAR1", "review_count": 100, "reviews": reviews}
         ]
 
         mock_db.get_product_by_id.return_value = mock_product_without_reviews
         mock_db.find_similar_products.return_value = similar_with_self
-        mock_db.get_product_reviews.return_value = [{"review_stars": 5, "review_text": "Great!"}] * 10
 
         similar = agent._find_similar_products_with_reviews(mock_product_without_reviews)
 
         # Should exclude the main product
         assert len(similar) == 1
         assert similar[0]["item_id"] == "B08SIMILAR1"
+        assert similar[0]["reviews"] == reviews
+
+        # Reviews were embedded in the search results - no follow-up request
+        assert mock_db.find_similar_products.call_args.kwargs["review_limit"] == 10
+        mock_db.get_reviews_for_products.assert_not_called()
 
     @patch('agents.product_context_agent.db')
     def test_similar_products_filter_excludes_no_reviews(
@@ -628,21 +628,48 @@ class TestProductContextAgent:
         mock_product_without_reviews
     ):
         """Test that similar products with no reviews are excluded"""
+        reviews = [{"review_stars": 5, "review_text": "Good"}] * 10
         similar_mixed = [
-            {"item_id": "B08SIM1", "review_count": 100},  # Has reviews
-            {"item_id": "B08SIM2", "review_count": 0},    # No reviews (exclude)
-            {"item_id": "B08SIM3", "review_count": 50}    # Has reviews
+            {"item_id": "B08SIM1", "review_count": 100, "reviews": reviews},  # Has reviews
+            {"item_id": "B08SIM2", "review_count": 0, "reviews": []},         # No reviews (exclude)
+            {"item_id": "B08SIM3", "review_count": 50, "reviews": reviews}    # Has reviews
         ]
 
         mock_db.get_product_by_id.return_value = mock_product_without_reviews
         mock_db.find_similar_products.return_value = similar_mixed
-        mock_db.get_product_reviews.return_value = [{"review_stars": 5, "review_text": "Good"}] * 10
 
         similar = agent._find_similar_products_with_reviews(mock_product_without_reviews)
 
         # Should only include products with reviews
         assert len(similar) == 2
         assert all(p["review_count"] > 0 for p in similar)
+        mock_db.get_reviews_for_products.assert_not_called()
+
+    @patch('agents.product_context_agent.db')
+    def test_similar_products_missing_reviews_fetched_in_one_request(
+        self,
+        mock_db,
+        agent,
+        mock_product_without_reviews
+    ):
+        """Test that products returned without embedded reviews get them in one batched request"""
+        embedded = [{"review_stars": 5, "review_text": "Embedded"}]
+        fetched = [{"review_stars": 4, "review_text": "Fetched"}]
+        similar = [
+            {"item_id": "B08SIM1", "review_count": 100, "reviews": embedded},
+            {"item_id": "B08SIM2", "review_count": 20},  # Reviews not embedded
+            {"item_id": "B08SIM3", "review_count": 50},  # Reviews not embedded, none found
+        ]
+
+        mock_db.find_similar_products.return_value = similar
+        mock_db.get_reviews_for_products.return_value = {"B08SIM2": fetched}
+
+        result = agent._find_similar_products_with_reviews(mock_product_without_reviews)
+
+        # Only the products missing reviews are fetched, all in one call
+        mock_db.get_reviews_for_products.assert_called_once_with(["B08SIM2", "B08SIM3"], limit=10)
+        assert [p["reviews"] for p in result] == [embedded, fetched, []]
+        mock_db.get_product_reviews.assert_not_called()
 
 
 if __name__ == "__main__":
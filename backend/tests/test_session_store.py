@@ -0,0 +1,128 @@
+"""
+Unit tests for the Redis-backed shared session store
+Uses an in-memory stand-in for the Redis client
+"""
+
+import importlib
+import pytest
+from unittest.mock import MagicMock
+from database import session_store
+from database.session_store import RedisSessionStore
+
+msgpack = pytest.importorskip("msgpack")
+survey_module = importlib.import_module("agents.survey_agent")
+
+
+class FakeRedis:
+    """The subset of redis.Redis the store uses, recording each key's last TTL"""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def getex(self, key, ex=None):
+        if key not in self.data:
+            return None
+        self.ttls[key] = ex
+        return self.data[key]
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.ttls[key] = ex
+
+    def delete(self, key):
+        self.data.pop(key, None)
+        self.ttls.pop(key, None)
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    """Fake Redis client returned by redis.Redis.from_url"""
+    client = FakeRedis()
+    fake_redis = MagicMock()
+    fake_redis.Redis.from_url.return_value = client
+    monkeypatch.setattr(session_store, "REDIS_AVAILABLE", True)
+    monkeypatch.setattr(session_store, "redis", fake_redis, raising=False)
+    monkeypatch.setattr(session_store, "msgpack", msgpack, raising=False)
+    return client
+
+
+@pytest.fixture
+def store(redis_client):
+    """Store with a one hour idle TTL"""
+    return RedisSessionStore("redis://localhost:6379/0", 3600.0)
+
+
+class TestRedisSessionStore:
+    """Test suite for RedisSessionStore"""
+
+    def test_requires_redis_and_msgpack(self, monkeypatch):
+        """Without the optional dependencies the store refuses to start"""
+        monkeypatch.setattr(session_store, "REDIS_AVAILABLE", False)
+
+        with pytest.raises(ValueError, match="redis and msgpack must be installed"):
+            RedisSessionStore("redis://localhost:6379/0", 3600.0)
+
+    def test_connects_from_url(self, store, redis_client):
+        """The client is built from the configured URL and the TTL kept in whole seconds"""
+        session_store.redis.Redis.from_url.assert_called_once_with("redis://localhost:6379/0")
+        assert store.client is redis_client
+        assert store.ttl_seconds == 3600
+
+    def test_set_writes_msgpack_with_ttl(self, store, redis_client):
+        """States are stored MessagePack-encoded under the survey: prefix with the idle TTL"""
+        store.set("s1", {"current_question_index": 2})
+
+        assert msgpack.unpackb(redis_client.data["survey:s1"]) == {"current_question_index": 2}
+        assert redis_client.ttls["survey:s1"] == 3600
+
+    def test_round_trip(self, store):
+        """Nested state survives a set/get round trip"""
+        state = {
+            "session_id": "s1",
+            "answers": [{"question_index": 0, "answer": "Très bien", "timestamp": "t"}],
+            "skipped_questions": [1, 3],
+            "consecutive_skips": 0,
+            "generated_reviews": None,
+            "all_questions": [{"question_text": "Q1?", "options": ["A", "B"], "allow_multiple": False}],
+        }
+        store.set("s1", state)
+
+        assert store.get("s1") == state
+
+    def test_get_refreshes_ttl(self, store, redis_client):
+        """Reads go through GETEX so each access restarts the idle TTL"""
+        store.set("s1", {"a": 1})
+        redis_client.ttls["survey:s1"] = 5  # nearly expired
+
+        store.get("s1")
+
+        assert redis_client.ttls["survey:s1"] == 3600
+
+    def test_get_unknown_session(self, store):
+        """Unknown or expired sessions read as None"""
+        assert store.get("missing") is None
+
+    def test_delete(self, store):
+        """Deleted sessions are gone"""
+        store.set("s1", {"a": 1})
+
+        store.delete("s1")
+
+        assert store.get("s1") is None
+
+    def test_shareable_state_round_trips(self, store):
+        """Survey state minus its lookup sets is MessagePack-serializable"""
+        state = {
+            "session_id": "s1",
+            "asked_question_texts": ["Q1?"],
+            "asked_question_texts_set": {"Q1?"},
+            "question_text_keys": {"q1"},
+            "answer_by_question_index": {0: "A"},
+        }
+        with pytest.raises(TypeError):
+            store.set("s1", state)
+
+        store.set("s1", survey_module._shareable_state(state))
+
+        assert store.get("s1") == {"session_id": "s1", "asked_question_texts": ["Q1?"]}
@@ -0,0 +1,293 @@
+"""
+Unit tests for SupabaseDB query methods
+Runs the real PostgREST request builders against a mocked HTTP transport
+"""
+
+import json
+import uuid
+import httpx
+import pytest
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qsl
+from postgrest import SyncPostgrestClient
+from database import supabase_client
+from database.supabase_client import SupabaseDB
+from utils.embeddings import to_pgvector
+
+REST_URL = "https://test.supabase.co/rest/v1"
+EMBEDDING = [0.1, 0.2, 0.3]
+
+
+class PostgrestRecorder:
+    """Mock transport recording each request and replying with queued JSON bodies"""
+
+    def __init__(self):
+        self.requests = []
+        self.responses = []
+        self.on_request = None
+
+    def __call__(self, request):
+        self.requests.append(request)
+        if self.on_request:
+            self.on_request()
+        if not self.responses:
+            return httpx.Response(201)
+        return httpx.Response(200, json=self.responses.pop(0))
+
+    @property
+    def last(self):
+        return self.requests[-1]
+
+    def params(self, request=None):
+        request = request or self.last
+        return parse_qsl(request.url.query.decode(), keep_blank_values=True)
+
+
+@pytest.fixture
+def postgrest():
+    """Recorder behind the PostgREST session"""
+    return PostgrestRecorder()
+
+
+@pytest.fixture
+def db(postgrest):
+    """SupabaseDB whose table()/rpc() build real requests sent to the recorder"""
+    rest = SyncPostgrestClient(REST_URL, headers={"apikey": "test-key"})
+    client = MagicMock()
+    client.postgrest = rest
+    client.table.side_effect = rest.from_
+    client.rpc.side_effect = rest.rpc
+    with patch.object(supabase_client, "create_client", return_value=client):
+        database = SupabaseDB()
+    rest.session.close()
+    rest.session = httpx.Client(base_url=REST_URL, transport=httpx.MockTransport(postgrest))
+    database._local_caches_enabled = True
+    yield database
+    rest.session.close()
+
+
+@pytest.fixture
+def embedding_service():
+    """Stub the review embedding call"""
+    with patch("utils.embeddings.embedding_service") as service:
+        service.generate_embedding.return_value = EMBEDDING
+        yield service
+
+
+def review_metadata(**overrides):
+    """Metadata as passed by the survey flow"""
+    metadata = {"transaction_id": "txn-1", "session_id": "s1", "review_title": "Great buy"}
+    metadata.update(overrides)
+    return metadata
+
+
+# ============================================================================
+# SURVEY DETAILS
+# ============================================================================
+
+
+class TestGetSessionQuestions:
+    """Test suite for get_session_questions"""
+
+    def test_queries_question_events_in_order(self, db, postgrest):
+        """One filtered, ordered read of the session's question_generated events"""
+        postgrest.responses.append([])
+
+        db.get_session_questions("s1")
+
+        request = postgrest.last
+        assert request.method == "GET"
+        assert request.url.path == "/rest/v1/survey_details"
+        assert postgrest.params() == [
+            ("select", "event_detail"),
+            ("session_id", "eq.s1"),
+            ("event_type", "eq.question_generated"),
+            ("order", "created_at"),
+        ]
+
+    def test_returns_event_details_skipping_empty(self, db, postgrest):
+        """event_detail values come back in order; rows without one are dropped"""
+        postgrest.responses.append([
+            {"event_detail": {"question_text": "Q1?"}},
+            {"event_detail": None},
+            {"event_detail": {}},
+            {"event_detail": {"question_text": "Q2?"}},
+        ])
+
+        questions = db.get_session_questions("s1")
+
+        assert questions == [{"question_text": "Q1?"}, {"question_text": "Q2?"}]
+
+
+# ============================================================================
+# PRODUCT REVIEWS
+# ============================================================================
+
+
+class TestGetReviewsForProducts:
+    """Test suite for get_reviews_for_products"""
+
+    def test_empty_ids_skip_request(self, db, postgrest):
+        """No products means no round-trip"""
+        assert db.get_reviews_for_products([]) == {}
+        assert postgrest.requests == []
+
+    def test_single_request_with_embedded_order_and_limit(self, db, postgrest):
+        """Reviews are embedded, limited and ordered newest first per product"""
+        postgrest.responses.append([])
+
+        db.get_reviews_for_products(["p1", "p2"], limit=3)
+
+        assert len(postgrest.requests) == 1
+        assert postgrest.last.url.path == "/rest/v1/products"
+        params = dict(postgrest.params())
+        assert params["select"] == "item_id, reviews(*)"
+        assert params["item_id"] == "in.(p1,p2)"
+        assert params["reviews.limit"] == "3"
+        assert params["reviews.order"] == "created_at.desc"
+        # Ordering must apply to the embedded reviews, not the products
+        assert "order" not in params
+
+    def test_maps_products_to_reviews(self, db, postgrest):
+        """Results are keyed by item_id; products without reviews map to []"""
+        reviews = [{"review_id": "r2"}, {"review_id": "r1"}]
+        postgrest.responses.append([
+            {"item_id": "p1", "reviews": reviews},
+            {"item_id": "p2", "reviews": []},
+            {"item_id": "p3", "reviews": None},
+        ])
+
+        result = db.get_reviews_for_products(["p1", "p2", "p3"])
+
+        assert result == {"p1": reviews, "p2": [], "p3": []}
+
+
+class TestFindSimilarProductsCache:
+    """Test suite for the find_similar_products result cache"""
+
+    def test_repeat_query_served_from_cache(self, db, postgrest):
+        """The same search within the TTL is one RPC"""
+        postgrest.responses.append([{"item_id": "p1"}])
+
+        first = db.find_similar_products(EMBEDDING)
+        second = db.find_similar_products(EMBEDDING)
+
+        assert first == second == [{"item_id": "p1"}]
+        assert len(postgrest.requests) == 1
+        assert postgrest.last.url.path == "/rest/v1/rpc/match_products"
+
+    def test_disabled_with_shared_state(self, db, postgrest):
+        """With local caches off (Redis configured) every search hits the database"""
+        db._local_caches_enabled = False
+        postgrest.responses.extend([[{"item_id": "p1"}], [{"item_id": "p2"}]])
+
+        assert db.find_similar_products(EMBEDDING) == [{"item_id": "p1"}]
+        assert db.find_similar_products(EMBEDDING) == [{"item_id": "p2"}]
+        assert len(postgrest.requests) == 2
+        assert len(db._similar_cache) == 0
+
+    def test_invalidation_during_search_not_cached(self, db, postgrest):
+        """Results of a search that overlapped a reviews write aren't cached"""
+        postgrest.responses.extend([[{"item_id": "stale"}], [{"item_id": "fresh"}]])
+        postgrest.on_request = db._invalidate_review_caches
+
+        assert db.find_similar_products(EMBEDDING) == [{"item_id": "stale"}]
+        postgrest.on_request = None
+
+        assert db.find_similar_products(EMBEDDING) == [{"item_id": "fresh"}]
+        assert len(postgrest.requests) == 2
+
+
+# ============================================================================
+# SAVE GENERATED REVIEW
+# ============================================================================
+
+
+class TestSaveGeneratedReview:
+    """Test suite for save_generated_review"""
+
+    def test_requires_transaction_id(self, db, postgrest, embedding_service):
+        """Reviews must link to an existing transaction"""
+        with pytest.raises(ValueError, match="transaction_id is required"):
+            db.save_generated_review(
+                "u1", "p1", "Nice.", 5, "positive", review_metadata(transaction_id=None)
+            )
+
+        assert postgrest.requests == []
+        embedding_service.generate_embedding.assert_not_called()
+
+    def test_session_context_uses_rpc(self, db, postgrest, embedding_service):
+        """With session_context the review and session update go in one RPC"""
+        postgrest.responses.append("review-123")
+        context = {"review_options": ["A", "B"], "selected": 0}
+
+        review_id = db.save_generated_review(
+            "u1", "p1", "Nice.", 5, "positive", review_metadata(), session_context=context
+        )
+
+        assert review_id == "review-123"
+        request = postgrest.last
+        assert request.method == "POST"
+        assert request.url.path == "/rest/v1/rpc/save_review_with_session_context"
+        assert json.loads(request.content) == {
+            "review_user_id": "u1",
+            "review_item_id": "p1",
+            "review_transaction_id": "txn-1",
+            "review_text": "Nice.",
+            "review_stars": 5,
+            "review_title": "Great buy",
+            "review_embeddings": to_pgvector(EMBEDDING),
+            "target_session_id": "s1",
+            "session_context": context,
+        }
+        embedding_service.generate_embedding.assert_called_once_with("Nice.")
+
+    def test_rpc_invalidates_session_and_review_caches(self, db, postgrest, embedding_service):
+        """The RPC drops the cached session row and review-derived caches"""
+        postgrest.responses.append("review-123")
+
+        with patch.object(db, "_invalidate_session_cache") as invalidate_session, \
+                patch.object(db, "_invalidate_review_caches") as invalidate_reviews:
+            db.save_generated_review(
+                "u1", "p1", "Nice.", 5, "positive", review_metadata(), session_context={}
+            )
+
+        invalidate_session.assert_called_once_with("s1")
+        invalidate_reviews.assert_called_once_with()
+
+    def test_insert_returns_minimal(self, db, postgrest, embedding_service):
+        """Without session_context the row is inserted without echoing it back"""
+        review_id = db.save_generated_review(
+            "u1", "p1", "Nice.", 4, "positive", review_metadata()
+        )
+
+        request = postgrest.last
+        assert request.method == "POST"
+        assert request.url.path == "/rest/v1/reviews"
+        assert "return=minimal" in request.headers["prefer"]
+        row = json.loads(request.content)
+        assert row["review_id"] == review_id
+        assert uuid.UUID(review_id)
+        assert row["transaction_id"] == "txn-1"
+        assert row["review_stars"] == 4
+        assert row["source"] == "user_survey"
+        assert row["manual_or_agent_generated"] == "agent"
+        assert row["embeddings"] == to_pgvector(EMBEDDING)
+
+    def test_insert_defaults_title(self, db, postgrest, embedding_service):
+        """A missing review_title falls back to the generic title"""
+        metadata = review_metadata()
+        del metadata["review_title"]
+
+        db.save_generated_review("u1", "p1", "Nice.", 4, "positive", metadata)
+
+        assert json.loads(postgrest.last.content)["review_title"] == "Product Review"
+
+    def test_insert_invalidates_review_caches_only(self, db, postgrest, embedding_service):
+        """A plain insert leaves the session cache alone"""
+        with patch.object(db, "_invalidate_session_cache") as invalidate_session, \
+                patch.object(db, "_invalidate_review_caches") as invalidate_reviews:
+            db.save_generated_review("u1", "p1", "Nice.", 4, "positive", review_metadata())
+
+        invalidate_session.assert_not_called()
+        invalidate_reviews.assert_called_once_with()
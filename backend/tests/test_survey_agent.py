@@ -0,0 +1,720 @@
+"""
+Unit tests for Survey Agent (Agent 3)
+Tests session state handling with the database and LLM mocked
+"""
+
+import asyncio
+import importlib
+import threading
+import time
+import pytest
+from concurrent.futures import Future
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# agents.survey_agent is shadowed by the survey_agent instance in agents/__init__
+survey_module = importlib.import_module("agents.survey_agent")
+SurveyAgent = survey_module.SurveyAgent
+
+
+@pytest.fixture
+def mock_db():
+    """Database client used by the survey agent"""
+    with patch.object(survey_module, "db") as db:
+        yield db
+
+
+@pytest.fixture
+def agent(mock_db):
+    """Agent with the in-process session state cache (no shared store)"""
+    agent = SurveyAgent()
+    agent._shared_store = None
+    yield agent
+    agent._executor.shutdown(wait=True)
+
+
+@pytest.fixture
+async def stop_writer(agent):
+    """Cancel the event writer task before the test's event loop closes"""
+    yield
+    if agent._event_writer is not None:
+        agent._event_writer.cancel()
+        await asyncio.gather(agent._event_writer, return_exceptions=True)
+
+
+def make_state(session_id: str, **overrides):
+    """Minimal in-progress survey state"""
+    state = {
+        "session_id": session_id,
+        "user_id": "u1",
+        "item_id": "i1",
+        "product_context": {"product_name": "Headphones"},
+        "customer_context": {"context_type": "demographics_only"},
+        "all_questions": [{"question_text": "Q1?", "options": ["A", "B"]}],
+        "current_question_index": 0,
+        "answers": [],
+        "skipped_questions": [],
+        "conversation_history": [{"role": "system", "content": "context"}],
+        # Transient fields - never persisted
+        "product_context_json": "{}",
+        "customer_context_json": "{}",
+        "answers_summary": "",
+        "asked_question_texts_set": {"q1?"},
+    }
+    state.update(overrides)
+    return state
+
+
+def in_progress_state(session_id: str, num_questions: int = 6, answered: int = 0):
+    """State with the first `answered` questions answered and the next one presented"""
+    questions = [{"question_text": f"Q{i}?", "options": ["A", "B"]} for i in range(1, num_questions + 1)]
+    answers = [
+        {"question_index": i, "question": questions[i]["question_text"], "answer": "A", "timestamp": "t"}
+        for i in range(answered)
+    ]
+    history = [{"role": "system", "content": "context"}]
+    for ans in answers:
+        history += [{"role": "assistant", "content": ans["question"]}, {"role": "user", "content": ans["answer"]}]
+    asked = [q["question_text"] for q in questions[:answered + 1]]
+    return make_state(
+        session_id,
+        all_questions=questions,
+        answers=answers,
+        conversation_history=history,
+        current_question_index=answered,
+        total_questions_asked=answered + 1,
+        answered_questions_count=answered,
+        consecutive_skips=0,
+        asked_question_texts=asked,
+        asked_question_texts_set=set(asked),
+        answers_summary=survey_module._format_answers_summary(answers),
+        skipped_summary="",
+    )
+
+
+@pytest.fixture
+def followup_llm(agent, mock_db, monkeypatch):
+    """Fake follow-up LLM call - unique questions per call, optionally held open"""
+    mock_db.insert_survey_details_bulk_async = AsyncMock(side_effect=lambda rows: len(rows))
+
+    class FollowupLLM:
+        def __init__(self):
+            self.calls = 0
+            self.release = asyncio.Event()
+            self.hold = False
+
+        async def __call__(self, cache_options, prompt_inputs):
+            self.calls += 1
+            batch = self.calls
+            if self.hold:
+                await self.release.wait()
+            return [
+                {"question_text": f"Follow-up {batch}.{i}?", "options": ["A", "B"]}
+                for i in range(1, prompt_inputs["num_questions"] + 1)
+            ]
+
+    llm = FollowupLLM()
+    monkeypatch.setattr(agent, "_ainvoke_followup_prompt", llm)
+    return llm
+
+
+def flush_background(agent):
+    """Wait for evicted-state flushes queued on the agent's worker pool"""
+    agent._executor.shutdown(wait=True)
+
+
+# ============================================================================
+# In-memory Session State Cache Tests
+# ============================================================================
+
+
+class TestSessionStateCache:
+    """Test suite for the LRU/TTL session state cache"""
+
+    def test_put_and_get_returns_same_state(self, agent):
+        """Cached state is returned as-is, without copying"""
+        state = make_state("s1")
+        agent._put_session_state("s1", state)
+
+        assert agent._get_session_state("s1") is state
+        assert agent._get_session_state("missing") is None
+
+    def test_get_refreshes_ttl_and_lru_order(self, agent):
+        """Reading a session extends its idle TTL and marks it most recently used"""
+        agent._put_session_state("s1", make_state("s1"))
+        agent._put_session_state("s2", make_state("s2"))
+        expires_before = agent._session_state_cache["s1"][0]
+
+        agent._get_session_state("s1")
+
+        assert list(agent._session_state_cache) == ["s2", "s1"]
+        assert agent._session_state_cache["s1"][0] >= expires_before
+
+    def test_lru_eviction_over_max_entries(self, agent, mock_db, monkeypatch):
+        """The least recently used session is evicted once the cache is full"""
+        monkeypatch.setattr(survey_module, "SESSION_STATE_MAX_ENTRIES", 2)
+        agent._put_session_state("s1", make_state("s1"))
+        agent._put_session_state("s2", make_state("s2"))
+        agent._get_session_state("s1")  # s2 is now least recently used
+
+        agent._put_session_state("s3", make_state("s3"))
+
+        assert list(agent._session_state_cache) == ["s1", "s3"]
+        flush_background(agent)
+        mock_db.update_session_context.assert_called_once()
+        assert mock_db.update_session_context.call_args[0][0] == "s2"
+
+    def test_evicted_state_flushed_without_transient_fields(self, agent, mock_db, monkeypatch):
+        """Evicted states are persisted to session_context minus derived lookups"""
+        monkeypatch.setattr(survey_module, "SESSION_STATE_MAX_ENTRIES", 1)
+        agent._put_session_state("s1", make_state("s1", current_question_index=3))
+
+        agent._put_session_state("s2", make_state("s2"))
+
+        flush_background(agent)
+        session_id, persisted = mock_db.update_session_context.call_args[0]
+        assert session_id == "s1"
+        assert persisted["current_question_index"] == 3
+        for key in survey_module._TRANSIENT_STATE_KEYS:
+            assert key not in persisted
+
+    def test_flush_failure_is_logged_not_raised(self, agent, mock_db, monkeypatch, capsys):
+        """A failed background flush only logs a warning"""
+        monkeypatch.setattr(survey_module, "SESSION_STATE_MAX_ENTRIES", 1)
+        mock_db.update_session_context.side_effect = Exception("DB down")
+        agent._put_session_state("s1", make_state("s1"))
+
+        agent._put_session_state("s2", make_state("s2"))
+
+        flush_background(agent)
+        assert "Failed to persist evicted session state s1" in capsys.readouterr().out
+
+    def test_expired_entries_swept_on_put(self, agent, mock_db):
+        """Idle-expired sessions are evicted and flushed by the next insert"""
+        agent._put_session_state("s1", make_state("s1"))
+        agent._session_state_cache["s1"] = (time.monotonic() - 1, agent._session_state_cache["s1"][1])
+
+        agent._put_session_state("s2", make_state("s2"))
+
+        assert "s1" not in agent._session_state_cache
+        flush_background(agent)
+        assert mock_db.update_session_context.call_args[0][0] == "s1"
+
+    def test_expired_entry_revived_on_access(self, agent, mock_db):
+        """An expired entry not yet swept is still the newest copy - returned, not reloaded"""
+        state = make_state("s1")
+        agent._put_session_state("s1", state)
+        agent._session_state_cache["s1"] = (time.monotonic() - 1, state)
+
+        assert agent._load_session_state("s1") is state
+        assert agent._session_state_cache["s1"][0] > time.monotonic()
+        mock_db.get_survey_session.assert_not_called()
+        flush_background(agent)
+        mock_db.update_session_context.assert_not_called()
+
+    def test_load_resumes_from_session_context(self, agent, mock_db):
+        """A session missing from the cache is resumed from a deep copy of session_context"""
+        context = make_state("s1")
+        for key in survey_module._TRANSIENT_STATE_KEYS:
+            context.pop(key, None)
+        mock_db.get_survey_session.return_value = {"session_id": "s1", "session_context": context}
+
+        state = agent._load_session_state("s1")
+
+        assert state["current_question_index"] == 0
+        assert state["product_context_json"]  # rebuilt on resume
+        state["answers"].append({"question_index": 0, "answer": "A"})
+        assert context["answers"] == []  # cached row untouched
+        assert agent._get_session_state("s1") is state
+
+    def test_load_does_not_resume_completed_session(self, agent, mock_db):
+        """Completed sessions are not resumed into the cache"""
+        mock_db.get_survey_session.return_value = {
+            "session_id": "s1",
+            "questions_and_answers": {"answers": []},
+            "session_context": make_state("s1"),
+        }
+
+        assert agent._load_session_state("s1") is None
+        assert "s1" not in agent._session_state_cache
+
+    def test_drop_forgets_state_without_flush(self, agent, mock_db):
+        """Dropping a finished session removes it without persisting"""
+        agent._put_session_state("s1", make_state("s1"))
+
+        agent._drop_session_state("s1")
+
+        assert agent._get_session_state("s1") is None
+        flush_background(agent)
+        mock_db.update_session_context.assert_not_called()
+
+    async def test_async_load_gives_up_on_stalled_initial_batch(self, agent, monkeypatch):
+        """A stalled initial batch is waited on once, off the loop, then forgotten"""
+        monkeypatch.setattr(survey_module, "_INITIAL_QUESTIONS_TIMEOUT_SECONDS", 0.05)
+        state = make_state("s1")
+        agent._put_session_state("s1", state)
+        blocking_waits = []
+
+        class StalledFuture(Future):
+            def result(self, timeout=None):
+                blocking_waits.append(timeout)
+                return super().result(timeout)
+
+        agent._initial_questions_pending["s1"] = StalledFuture()  # never resolves
+
+        assert await agent._aload_session_state("s1") is state
+
+        assert blocking_waits == []  # never Future.result() on the event loop
+        assert "s1" not in agent._initial_questions_pending
+
+
+# ============================================================================
+# Batched Event Writer Tests
+# ============================================================================
+
+
+@pytest.mark.usefixtures("stop_writer")
+class TestEventWriter:
+    """Test suite for the background survey_details event writer"""
+
+    @pytest.fixture
+    def bulk_insert(self, mock_db, monkeypatch):
+        """Bulk insert mock, with the writer's batching delay shortened"""
+        monkeypatch.setattr(survey_module, "EVENT_FLUSH_INTERVAL_SECONDS", 0.01)
+        mock_db.insert_survey_details_bulk_async = AsyncMock(side_effect=lambda rows: len(rows))
+        return mock_db.insert_survey_details_bulk_async
+
+    @staticmethod
+    def written_batches(bulk_insert):
+        """Event types of each bulk insert, in call order"""
+        return [[row["event_type"] for row in call.args[0]] for call in bulk_insert.call_args_list]
+
+    async def test_burst_written_in_one_batch(self, agent, bulk_insert):
+        """Events logged together are written in a single bulk insert"""
+        agent._log_event_async("s1", "answer_submitted", {"question_number": 1})
+        agent._log_event_async("s1", "question_generated", {"question_number": 2})
+
+        await agent.flush_events()
+
+        assert self.written_batches(bulk_insert) == [["answer_submitted", "question_generated"]]
+        row = bulk_insert.call_args.args[0][0]
+        assert row == {
+            "session_id": "s1",
+            "event_type": "answer_submitted",
+            "event_detail": {"question_number": 1},
+        }
+
+    async def test_batches_capped_at_max_size(self, agent, bulk_insert, monkeypatch):
+        """A backlog is split into batches of EVENT_BATCH_MAX_SIZE rows"""
+        monkeypatch.setattr(survey_module, "EVENT_BATCH_MAX_SIZE", 2)
+        for i in range(5):
+            agent._log_event_async("s1", f"event_{i}")
+
+        await agent.flush_events()
+
+        assert self.written_batches(bulk_insert) == [
+            ["event_0", "event_1"], ["event_2", "event_3"], ["event_4"],
+        ]
+
+    async def test_queue_overflow_drops_oldest(self, agent, bulk_insert, monkeypatch, capsys):
+        """A full queue sheds its oldest events instead of blocking the survey"""
+        monkeypatch.setattr(survey_module, "EVENT_QUEUE_MAX_SIZE", 3)
+        for i in range(5):
+            agent._log_event_async("s1", f"event_{i}")
+
+        assert agent._dropped_events == 2
+        await agent.flush_events()
+
+        assert self.written_batches(bulk_insert) == [["event_2", "event_3", "event_4"]]
+        assert "dropped 2 oldest events" in capsys.readouterr().out
+        assert agent._dropped_events == 0
+
+    async def test_insert_failure_does_not_stall_writer(self, agent, bulk_insert, capsys):
+        """A failed bulk insert is logged and later events are still written"""
+        bulk_insert.side_effect = [Exception("DB down"), 1]
+        agent._log_event_async("s1", "event_0")
+        await agent.flush_events()
+
+        agent._log_event_async("s1", "event_1")
+        await agent.flush_events()
+
+        assert "Background event log failed (1 events): DB down" in capsys.readouterr().out
+        assert self.written_batches(bulk_insert) == [["event_0"], ["event_1"]]
+
+    async def test_flush_events_waits_for_pending_writes(self, agent, bulk_insert):
+        """flush_events (used on shutdown) returns only once every event is written"""
+        written = []
+
+        async def slow_insert(rows):
+            await asyncio.sleep(0.05)
+            written.extend(rows)
+            return len(rows)
+
+        bulk_insert.side_effect = slow_insert
+        agent._log_event_async("s1", "survey_completed")
+
+        await agent.flush_events()
+
+        assert [row["event_type"] for row in written] == ["survey_completed"]
+
+    async def test_flush_events_without_events(self, agent, bulk_insert):
+        """flush_events is a no-op before any event was logged"""
+        await agent.flush_events()
+
+        bulk_insert.assert_not_called()
+
+
+# ============================================================================
+# Start Survey Tests
+# ============================================================================
+
+
+class TestStartSurvey:
+    """Test suite for start_survey failure handling"""
+
+    @pytest.fixture
+    def contexts(self):
+        """Context agents returning minimal frozen contexts"""
+        product_context = MagicMock()
+        product_context.model_dump.return_value = {"product_name": "Headphones"}
+        customer_context = MagicMock()
+        customer_context.model_dump.return_value = {"context_type": "demographics_only"}
+        with patch.object(survey_module.product_context_agent, "generate_context", return_value=product_context), \
+             patch.object(survey_module.customer_context_agent, "generate_context", return_value=customer_context):
+            yield
+
+    async def test_session_insert_failure_stops_question_stream(self, agent, mock_db, contexts):
+        """If the session INSERT fails, the initial question stream is abandoned"""
+        mock_db.get_user_transaction_for_product.return_value = {"transaction_id": "t1"}
+        mock_db.create_survey_session.side_effect = Exception("insert failed")
+        resume_stream = threading.Event()
+        stream_closed = threading.Event()
+        streamed = []
+
+        def stream(state):
+            try:
+                for i in range(1, 4):
+                    if i > 1:
+                        resume_stream.wait(timeout=5)
+                    streamed.append(i)
+                    yield {"question_text": f"Q{i}?", "options": ["A", "B"]}
+            finally:
+                stream_closed.set()
+
+        with patch.object(agent, "_stream_initial_questions", side_effect=stream):
+            with pytest.raises(Exception, match="insert failed"):
+                await agent.start_survey("u1", "i1", {})
+            resume_stream.set()
+
+        assert stream_closed.wait(timeout=5)
+        assert streamed == [1, 2]  # stopped at the next question
+        assert agent._initial_questions_pending == {}
+        assert not agent._session_state_cache
+
+
+# ============================================================================
+# Follow-up Prefetch Tests
+# ============================================================================
+
+
+@pytest.mark.usefixtures("stop_writer")
+class TestFollowupPrefetch:
+    """Test suite for speculative follow-up batches"""
+
+    async def test_prefetched_batch_reused_at_boundary(self, agent, followup_llm):
+        """The batch prefetched one answer early serves the follow-up boundary"""
+        agent._put_session_state("s1", in_progress_state("s1", num_questions=3, answered=1))
+
+        await agent.submit_answer("s1", "A")  # answered 2 - next answer hits the boundary
+        await asyncio.sleep(0)
+        assert "s1" in agent._followup_prefetch
+        assert followup_llm.calls == 1
+
+        result = await agent.submit_answer("s1", "B")  # answered 3 - follow-up round
+
+        assert followup_llm.calls == 1  # no second LLM round-trip
+        assert result["question"]["question_text"] == "Follow-up 1.1?"
+        assert "s1" not in agent._followup_prefetch
+
+    async def test_prefetch_discarded_when_boundary_missed(self, agent, followup_llm):
+        """A skip moves the boundary, so the prefetched batch is cancelled and regenerated"""
+        agent._put_session_state("s1", in_progress_state("s1", num_questions=6, answered=1))
+        followup_llm.hold = True
+        await agent.submit_answer("s1", "A")
+        prefetch = agent._followup_prefetch["s1"][1]
+
+        await agent.skip_question("s1")
+        await agent._take_prefetched_followups("s1", agent._get_session_state("s1"))
+        await asyncio.wait([prefetch], timeout=1)
+
+        assert prefetch.cancelled()
+        assert "s1" not in agent._followup_prefetch
+
+    async def test_new_prefetch_cancels_previous(self, agent, followup_llm):
+        """Replacing a session's prefetch cancels the earlier task"""
+        followup_llm.hold = True
+        state = in_progress_state("s1", num_questions=3, answered=2)
+        state["current_question_index"] = 1
+        agent._prefetch_followup_questions("s1", state)
+        first = agent._followup_prefetch["s1"][1]
+
+        agent._prefetch_followup_questions("s1", state)
+        await asyncio.wait([first], timeout=1)
+
+        assert first.cancelled()
+        assert not agent._followup_prefetch["s1"][1].cancelled()
+        agent._drop_session_state("s1")
+
+    async def test_edit_cancels_prefetch(self, agent, followup_llm):
+        """An edit discards the branch the prefetched batch was built from"""
+        agent._put_session_state("s1", in_progress_state("s1", num_questions=3, answered=1))
+        followup_llm.hold = True
+        await agent.submit_answer("s1", "A")
+        prefetch = agent._followup_prefetch["s1"][1]
+
+        await agent.edit_answer("s1", 1, "B")
+        await asyncio.wait([prefetch], timeout=1)
+
+        assert prefetch.cancelled()
+        assert "s1" not in agent._followup_prefetch
+
+    async def test_drop_cancels_prefetch(self, agent, followup_llm):
+        """Finished sessions cancel their speculative batch"""
+        agent._put_session_state("s1", in_progress_state("s1", num_questions=3, answered=1))
+        followup_llm.hold = True
+        await agent.submit_answer("s1", "A")
+        prefetch = agent._followup_prefetch["s1"][1]
+
+        agent._drop_session_state("s1")
+        await asyncio.wait([prefetch], timeout=1)
+
+        assert prefetch.cancelled()
+
+
+# ============================================================================
+# Per-session Turn Lock Tests
+# ============================================================================
+
+
+@pytest.mark.usefixtures("stop_writer")
+class TestSessionTurnLock:
+    """Test suite for serializing concurrent turns of one session"""
+
+    async def test_concurrent_submit_and_skip_serialized(self, agent, followup_llm):
+        """Turns queued behind a slow follow-up round each see the previous turn's state"""
+        agent._put_session_state("s1", in_progress_state("s1", num_questions=6, answered=2))
+        followup_llm.hold = True
+
+        turns = asyncio.gather(
+            agent.submit_answer("s1", "A"),  # answered 3 - waits on the follow-up LLM
+            agent.skip_question("s1"),
+            agent.submit_answer("s1", "C"),
+        )
+        await asyncio.sleep(0.01)
+        followup_llm.release.set()
+        results = await turns
+
+        assert [r["question_number"] for r in results] == [4, 5, 6]
+        state = agent._get_session_state("s1")
+        assert [(a["question_index"], a["answer"]) for a in state["answers"]] == [
+            (0, "A"), (1, "A"), (2, "A"), (4, "C"),
+        ]
+        assert state["skipped_questions"] == [3]
+        # One follow-up round for the answer and one for the skip that follows it
+        assert len(state["all_questions"]) == 10
+        assert len(state["conversation_history"]) == 1 + 2 * 5
+
+    async def test_lock_entry_removed_after_last_turn(self, agent, followup_llm):
+        """Lock entries only exist while a turn holds or waits on them"""
+        agent._put_session_state("s1", in_progress_state("s1", num_questions=6, answered=0))
+
+        await asyncio.gather(agent.submit_answer("s1", "A"), agent.submit_answer("s1", "B"))
+
+        assert agent._session_locks == {}
+
+    async def test_waiter_keeps_lock_across_completion(self, agent, followup_llm, mock_db):
+        """A turn queued behind the completing turn reuses its lock, not a fresh one"""
+        state = in_progress_state("s1", num_questions=12, answered=9)
+        agent._put_session_state("s1", state)
+        mock_db.get_survey_session.return_value = None
+        entered = []
+
+        async def turn():
+            async with agent._session_turn("s1"):
+                entered.append(agent._session_locks["s1"])
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(agent.submit_answer("s1", "A"), turn(), turn())
+
+        assert entered[0] is entered[1]
+        assert agent._session_locks == {}
+
+
+# ============================================================================
+# Shared Session Store Tests
+# ============================================================================
+
+
+class ThreadRecordingStore:
+    """Dict-backed stand-in for RedisSessionStore recording which thread made each call"""
+
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+
+    def get(self, session_id):
+        self.calls.append(("get", threading.get_ident()))
+        return self.data.get(session_id)
+
+    def set(self, session_id, state):
+        self.calls.append(("set", threading.get_ident()))
+        self.data[session_id] = state
+
+    def delete(self, session_id):
+        self.calls.append(("delete", threading.get_ident()))
+        self.data.pop(session_id, None)
+
+
+@pytest.mark.usefixtures("stop_writer")
+class TestSharedStoreOffload:
+    """Test suite for keeping blocking shared-store calls off the event loop"""
+
+    @pytest.fixture
+    def store(self, agent):
+        """Shared store installed on the agent"""
+        agent._shared_store = ThreadRecordingStore()
+        return agent._shared_store
+
+    @staticmethod
+    def loop_thread_calls(store):
+        """Store calls made on the event loop thread"""
+        return [name for name, ident in store.calls if ident == threading.get_ident()]
+
+    async def test_put_and_drop_run_in_worker_thread(self, agent, store):
+        """_aput/_adrop_session_state hand the store calls to a worker thread"""
+        await agent._aput_session_state("s1", make_state("s1"))
+        assert "s1" in store.data
+
+        await agent._adrop_session_state("s1")
+
+        assert "s1" not in store.data
+        assert [name for name, _ in store.calls] == ["set", "delete"]
+        assert self.loop_thread_calls(store) == []
+
+    async def test_shared_state_excludes_lookup_sets(self, agent, store):
+        """Stored states leave out the sets MessagePack can't encode"""
+        await agent._aput_session_state("s1", make_state("s1"))
+
+        assert "asked_question_texts_set" not in store.data["s1"]
+
+    async def test_turns_never_touch_store_on_loop(self, agent, store, followup_llm, mock_db):
+        """Answer, skip, edit and completion turns load, store and drop off the loop"""
+        store.data["s1"] = survey_module._shareable_state(
+            in_progress_state("s1", num_questions=12, answered=8)
+        )
+
+        await agent.submit_answer("s1", "A")
+        await agent.skip_question("s1")
+        await agent.edit_answer("s1", 9, "B")
+        result = await agent.submit_answer("s1", "C")
+
+        assert result["status"] == "survey_completed"
+        mock_db.complete_survey_session.assert_called_once()
+        assert "s1" not in store.data
+        assert {"get", "set", "delete"} <= {name for name, _ in store.calls}
+        assert self.loop_thread_calls(store) == []
+
+
+# ============================================================================
+# Edit Answer Branching Tests
+# ============================================================================
+
+
+@pytest.mark.usefixtures("stop_writer", "followup_llm")
+class TestEditAnswerBranching:
+    """Test suite for editing an earlier answer and branching from it"""
+
+    @staticmethod
+    def answer_pairs(state):
+        return [(a["question_index"], a["answer"]) for a in state["answers"]]
+
+    @staticmethod
+    def assert_consistent(state):
+        """Derived fields agree with the answers list after the branch"""
+        answers = state["answers"]
+        assert state["answers_summary"] == survey_module._format_answers_summary(answers)
+        assert survey_module._answer_index(state) == survey_module._build_answer_index(answers)
+        assert state["answered_questions_count"] == len(answers)
+        assert state["conversation_history"][0] == {"role": "system", "content": "context"}
+
+    async def test_edit_first_answer(self, agent):
+        """Editing the first answer discards every later answer"""
+        agent._put_session_state("s1", in_progress_state("s1", num_questions=6, answered=4))
+
+        result = await agent.edit_answer("s1", 1, "B")
+
+        state = agent._get_session_state("s1")
+        assert self.answer_pairs(state) == [(0, "B")]
+        assert state["conversation_history"] == [
+            {"role": "system", "content": "context"},
+            {"role": "assistant", "content": "Q1?"},
+            {"role": "user", "content": "B"},
+        ]
+        assert state["current_question_index"] == 1
+        assert result["status"] == "continue"
+        assert result["question_number"] == 2
+        self.assert_consistent(state)
+
+    async def test_edit_middle_answer(self, agent):
+        """Editing a middle answer keeps the earlier ones and truncates history in place"""
+        agent._put_session_state("s1", in_progress_state("s1", num_questions=6, answered=4))
+        history = agent._get_session_state("s1")["conversation_history"]
+
+        result = await agent.edit_answer("s1", 3, "Z")
+
+        state = agent._get_session_state("s1")
+        assert self.answer_pairs(state) == [(0, "A"), (1, "A"), (2, "Z")]
+        assert state["conversation_history"] is history
+        assert [m["content"] for m in history] == ["context", "Q1?", "A", "Q2?", "A", "Q3?", "Z"]
+        assert state["total_questions_asked"] == 3
+        assert result["question_number"] == 4
+        self.assert_consistent(state)
+
+    async def test_edit_answer_after_skip(self, agent):
+        """Skips before the edited question are kept; history is rebuilt from the answers"""
+        agent._put_session_state("s1", in_progress_state("s1", num_questions=6, answered=2))
+        await agent.skip_question("s1")  # Q3
+        await agent.submit_answer("s1", "C")  # Q4
+
+        result = await agent.edit_answer("s1", 4, "D")
+
+        state = agent._get_session_state("s1")
+        assert self.answer_pairs(state) == [(0, "A"), (1, "A"), (3, "D")]
+        assert state["skipped_questions"] == [2]
+        assert state["skipped_summary"] == "- Q3?"
+        assert [m["content"] for m in state["conversation_history"]] == [
+            "context", "Q1?", "A", "Q2?", "A", "Q4?", "D",
+        ]
+        assert result["question_number"] == 5
+        self.assert_consistent(state)
+
+    async def test_edit_skipped_question(self, agent):
+        """Answering a skipped question through edit drops that skip and everything after it"""
+        agent._put_session_state("s1", in_progress_state("s1", num_questions=6, answered=2))
+        await agent.skip_question("s1")  # Q3
+        await agent.submit_answer("s1", "C")  # Q4
+
+        await agent.edit_answer("s1", 3, "E")
+
+        state = agent._get_session_state("s1")
+        assert self.answer_pairs(state) == [(0, "A"), (1, "A"), (2, "E")]
+        assert state["skipped_questions"] == []
+        assert state["skipped_summary"] == ""
+        assert state["consecutive_skips"] == 0
+        self.assert_consistent(state)
+
+    async def test_edit_invalid_question_number(self, agent):
+        """Question numbers outside the survey are rejected"""
+        agent._put_session_state("s1", in_progress_state("s1", num_questions=6, answered=2))
+
+        with pytest.raises(ValueError, match="Invalid question number"):
+            await agent.edit_answer("s1", 7, "A")
@@ -0,0 +1,99 @@
+"""
+Unit tests for utils (pgvector encoding and JSON serialization)
+"""
+
+import pytest
+import numpy as np
+from datetime import date, datetime, timezone
+from utils import serialization
+from utils.embeddings import to_pgvector
+from utils.serialization import json_dumps, json_loads
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def backend(request, monkeypatch):
+    """Run a test against orjson (when installed) and the stdlib fallback"""
+    if request.param == "orjson":
+        if serialization.orjson is None:
+            pytest.skip("orjson not installed")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+
+class TestToPgvector:
+    """Test suite for to_pgvector"""
+
+    def test_literal_format(self):
+        """Encodes as a bracketed, comma-separated literal without spaces"""
+        assert to_pgvector([1, 2.5, -3]) == "[1.0,2.5,-3.0]"
+
+    def test_float32_precision(self):
+        """Values are written at float32 precision, not as full doubles"""
+        literal = to_pgvector([0.1, 1 / 3])
+
+        assert literal == "[0.1,0.33333334]"
+        values = [float(v) for v in literal[1:-1].split(",")]
+        assert np.array_equal(
+            np.asarray(values, dtype=np.float32),
+            np.asarray([0.1, 1 / 3], dtype=np.float32),
+        )
+
+    def test_small_values_round_trip(self):
+        """Exponent notation parses back to the same float32 values"""
+        embedding = [2.5e-8, -1e-12, 123456.789]
+        values = json_loads(to_pgvector(embedding))
+
+        assert np.array_equal(
+            np.asarray(values, dtype=np.float32),
+            np.asarray(embedding, dtype=np.float32),
+        )
+
+    def test_accepts_numpy_array(self):
+        """numpy arrays encode the same as lists"""
+        assert to_pgvector(np.array([0.5, 0.25])) == to_pgvector([0.5, 0.25])
+
+    def test_empty(self):
+        """Empty embedding encodes as an empty literal"""
+        assert to_pgvector([]) == "[]"
+
+
+class TestJsonSerialization:
+    """Test suite for json_dumps / json_loads with both backends"""
+
+    def test_compact_by_default(self, backend):
+        """Default output has no whitespace and keeps non-ASCII text"""
+        assert json_dumps({"a": [1, 2], "b": "café"}) == '{"a":[1,2],"b":"café"}'
+
+    def test_indent_and_sort_keys(self, backend):
+        """indent/sort_keys produce the same deterministic text on both backends"""
+        result = json_dumps({"b": 1, "a": {"d": [1], "c": None}}, indent=True, sort_keys=True)
+
+        assert result == '{\n  "a": {\n    "c": null,\n    "d": [\n      1\n    ]\n  },\n  "b": 1\n}'
+
+    def test_non_str_keys(self, backend):
+        """Int dict keys are written as strings, like stdlib json does"""
+        assert json_loads(json_dumps({1: "a", 2: "b"})) == {"1": "a", "2": "b"}
+
+    def test_datetime_values(self, backend):
+        """datetimes and dates are written as ISO 8601 strings"""
+        stamp = datetime(2024, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+        result = json_loads(json_dumps({"at": stamp, "day": date(2024, 1, 2)}))
+
+        assert result == {"at": "2024-01-02T03:04:05.678000+00:00", "day": "2024-01-02"}
+
+    def test_unsupported_type_raises(self, backend):
+        """Types neither backend can encode raise TypeError"""
+        with pytest.raises(TypeError):
+            json_dumps({"value": object()})
+
+    def test_loads_str_and_bytes(self, backend):
+        """json_loads accepts both str and UTF-8 bytes"""
+        assert json_loads('{"a": [1, 2.5]}') == {"a": [1, 2.5]}
+        assert json_loads('{"a": "café"}'.encode("utf-8")) == {"a": "café"}
+
+    def test_round_trip(self, backend):
+        """Nested state survives a dumps/loads round trip"""
+        state = {"answers": [{"question_index": 0, "answer": ["A", "B"]}], "count": 1, "ok": True}
+
+        assert json_loads(json_dumps(state)) == state
@@ -1,5 +1,6 @@
 """Utilities package"""
 
-from .embeddings import embedding_service, EmbeddingService
+from .embeddings import embedding_service, EmbeddingService, to_pgvector
+from .serialization import json_dumps, json_loads
 
-__all__ = ["embedding_service", "EmbeddingService"]
+__all__ = ["embedding_service", "EmbeddingService", "to_pgvector", "json_dumps", "json_loads"]
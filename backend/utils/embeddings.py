@@ -36,5 +36,15 @@ class EmbeddingService:
         return float(np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2)))
 
 
+def to_pgvector(embedding: List[float]) -> str:
+    """
+    Encode an embedding as a pgvector text literal ("[x,y,...]")
+
+    pgvector stores float32, so values are written at float32 precision - the
+    same vector in roughly half the bytes of a JSON list of doubles.
+    """
+    return "[" + ",".join(map(str, np.asarray(embedding, dtype=np.float32))) + "]"
+
+
 # Global embedding service instance
 embedding_service = EmbeddingService()
@@ -0,0 +1,60 @@
+"""
+JSON serialization helpers
+Uses orjson (C extension) when available, falls back to stdlib json
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_default(obj: Any) -> Any:
+    """Encode datetimes like orjson does (ISO 8601) for the stdlib fallback"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def json_dumps(obj: Any, indent: bool = False, sort_keys: bool = False) -> str:
+    """
+    Serialize object to a JSON string
+
+    Non-str dict keys are written as strings and datetimes as ISO 8601, with
+    either backend.
+
+    Args:
+        obj: JSON-compatible object
+        indent: Pretty-print with 2-space indentation
+        sort_keys: Sort dict keys (deterministic output, e.g. for prompt prefixes)
+
+    Returns:
+        JSON string
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, option=option).decode("utf-8")
+
+    return json.dumps(
+        obj,
+        indent=2 if indent else None,
+        separators=None if indent else (",", ":"),
+        sort_keys=sort_keys,
+        ensure_ascii=False,
+        default=_json_default,
+    )
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """Deserialize a JSON string or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)